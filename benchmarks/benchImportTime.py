@@ -0,0 +1,60 @@
+"""
+Measures the startup cost of terminal.py with python -X importtime and fails
+when importing it takes longer than the budget, so heavy modules (pandas,
+matplotlib, the data sources) don't creep back into the startup path.
+
+python3 benchmarks/benchImportTime.py [--budget 300] [--top 15] [--module terminal]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# import time:  self [us] | cumulative | imported package
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$")
+
+
+def measureImport(module: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Imports module in a fresh interpreter
+    :param module:
+    :return: (name, depth, self us, cumulative us) for every imported module
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"import {module} failed :\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            selfTime, cumulative, indent, name = match.groups()
+            rows.append((name, (len(indent) - 1) // 2, int(selfTime), int(cumulative)))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="benchImportTime")
+    parser.add_argument("--budget", type=float, default=300, help="budget in ms")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--module", default="terminal")
+    args = parser.parse_args()
+
+    rows = measureImport(args.module)
+    # the last top level entry is the module itself, the others are interpreter startup
+    total = next(c for name, depth, _, c in reversed(rows) if depth == 0 and name == args.module) / 1e3
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for name, _, selfTime, cumulative in sorted(rows, key=lambda row: -row[3])[: args.top]:
+        print(f"{cumulative / 1e3:9.1f} ms {selfTime / 1e3:7.1f} ms  {name}")
+    print(f"import {args.module} : {total:.1f} ms (budget {args.budget:.0f} ms)")
+
+    if total > args.budget:
+        sys.exit(f"import {args.module} is over budget by {total - args.budget:.1f} ms")
@@ -0,0 +1,83 @@
+"""
+Compares the previous from_dict/astype parsing of an Alpha Vantage daily time
+series with parsers.parseTimeSeries (JSON) and parsers.parseTimeSeriesCSV
+(datatype=csv) on a synthetic full-history payload. Every path starts from
+the raw response body, so JSON decoding is included.
+
+python3 benchmarks/benchParsing.py [--years 25] [--repeat 20]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parsers import parseTimeSeries, parseTimeSeriesCSV  # noqa: E402
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def makePayload(years: int) -> dict:
+    dates = pd.bdate_range(end="2024-12-31", periods=years * 252)[::-1]
+    prices = 100 + np.random.default_rng(0).standard_normal(len(dates)).cumsum()
+    return {
+        date.strftime("%Y-%m-%d"): {
+            "1. open": f"{price:.4f}",
+            "2. high": f"{price + 1:.4f}",
+            "3. low": f"{price - 1:.4f}",
+            "4. close": f"{price + 0.5:.4f}",
+            "5. volume": str(1_000_000 + i),
+        }
+        for i, (date, price) in enumerate(zip(dates, prices))
+    }
+
+
+def makeCSV(series: dict) -> bytes:
+    rows = ["timestamp,open,high,low,close,volume"]
+    rows += [",".join([date, *bar.values()]) for date, bar in series.items()]
+    return "\n".join(rows).encode()
+
+
+def parseFromDict(series: dict) -> pd.DataFrame:
+    df = pd.DataFrame.from_dict(series, orient="index")
+    df.columns = COLUMNS
+    for column in df.columns:
+        df[column] = df[column].astype(float)
+    df.sort_index(inplace=True)
+    df.index = pd.to_datetime(df.index)
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="benchParsing")
+    parser.add_argument("--years", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    series = makePayload(args.years)
+    jsonBody = json.dumps({"Time Series (Daily)": series}).encode()
+    csvBody = makeCSV(series)
+    pd.testing.assert_frame_equal(
+        parseFromDict(series),
+        parseTimeSeries(series, COLUMNS),
+        check_freq=False,
+        check_index_type=False,  # datetime64 resolution differs between pandas versions
+    )
+
+    print(f"{len(series)} rows, best of {args.repeat}")
+    results = {}
+    for name, function in (
+        ("from_dict + astype", lambda: parseFromDict(json.loads(jsonBody)["Time Series (Daily)"])),
+        ("parseTimeSeries", lambda: parseTimeSeries(json.loads(jsonBody)["Time Series (Daily)"], COLUMNS)),
+        ("parseTimeSeriesCSV", lambda: parseTimeSeriesCSV(io.BytesIO(csvBody), COLUMNS)),
+    ):
+        results[name] = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        print(f"{name:>20} : {results[name] * 1e3:8.2f} ms")
+    for name in ("parseTimeSeries", "parseTimeSeriesCSV"):
+        speedup = results["from_dict + astype"] / results[name]
+        print(f"{name:>20} : {speedup:8.1f}x faster")
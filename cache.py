@@ -0,0 +1,71 @@
+import datetime
+import os
+from pathlib import Path
+from typing import Union
+from zoneinfo import ZoneInfo
+
+
+class CachePolicy:
+    """
+    Caching settings shared by every data source.
+
+    Daily series kept in the store, or in memory, expire after ``ttl`` or at the
+    first market close after they were written, whichever comes first. Downloaded
+    reference files (e.g. the symbol listing) are kept under ``cacheDir``.
+    """
+
+    cacheDirKeyName: str = "OPENTERMINAL_CACHE_DIR"
+    ttlKeyName: str = "OPENTERMINAL_CACHE_TTL"
+    marketCloseKeyName: str = "OPENTERMINAL_MARKET_CLOSE"
+    marketTimezoneKeyName: str = "OPENTERMINAL_MARKET_TIMEZONE"
+
+    def __init__(
+        self,
+        cacheDir: Union[str, Path, None] = None,
+        ttl: Union[datetime.timedelta, None] = None,
+        marketClose: Union[datetime.time, None] = None,
+        marketTimezone: Union[str, None] = None,
+    ):
+        """
+        :param cacheDir: directory of the downloaded reference files (env: OPENTERMINAL_CACHE_DIR)
+        :param ttl: maximum age of a daily series (env: OPENTERMINAL_CACHE_TTL, in seconds)
+        :param marketClose: local market close time (env: OPENTERMINAL_MARKET_CLOSE, HH:MM)
+        :param marketTimezone: timezone of the market close (env: OPENTERMINAL_MARKET_TIMEZONE)
+        """
+        self.cacheDir = Path(
+            cacheDir or os.environ.get(self.cacheDirKeyName, "~/.openterminal/cache")
+        ).expanduser()
+        self.ttl = ttl or datetime.timedelta(
+            seconds=float(os.environ.get(self.ttlKeyName, 24 * 60 * 60))
+        )
+        self.marketClose = marketClose or datetime.time.fromisoformat(
+            os.environ.get(self.marketCloseKeyName, "16:00")
+        )
+        self.marketTimezone = ZoneInfo(
+            marketTimezone or os.environ.get(self.marketTimezoneKeyName, "America/New_York")
+        )
+
+    def nextMarketClose(self, after: datetime.datetime) -> datetime.datetime:
+        """
+        Returns the first market close (Mon-Fri) strictly after the given time
+        :param after: timezone aware datetime
+        :return:
+        """
+        after = after.astimezone(self.marketTimezone)
+        close = datetime.datetime.combine(
+            after.date(), self.marketClose, tzinfo=self.marketTimezone
+        )
+        if close <= after:
+            close += datetime.timedelta(days=1)
+        while close.weekday() >= 5:
+            close += datetime.timedelta(days=1)
+        return close
+
+    def expiresAt(self, writtenAt: datetime.datetime) -> datetime.datetime:
+        return min(writtenAt + self.ttl, self.nextMarketClose(writtenAt))
+
+    def isExpired(self, path: Path) -> bool:
+        writtenAt = datetime.datetime.fromtimestamp(
+            path.stat().st_mtime, tz=datetime.timezone.utc
+        )
+        return datetime.datetime.now(datetime.timezone.utc) >= self.expiresAt(writtenAt)
@@ -0,0 +1,285 @@
+import argparse
+import datetime
+import os
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Union
+
+from common import console, inputhook, session, showFigure
+from windows import parseWindowArgument
+
+
+def argument(*flags: str, **kwargs) -> Tuple[Tuple[str, ...], Dict[str, Any]]:
+    """
+    Describes an argument of a command, with the parameters of ArgumentParser.add_argument
+    e.g. argument("--ticker", "-t", type=str, required=True)
+    """
+    return flags, kwargs
+
+
+def command(name: str, *aliases: str, arguments: Sequence = (), help: str = ""):
+    """
+    Registers the decorated SectionLoop method as the handler of a command
+    :param name: name of the command, e.g. "plotLine"
+    :param aliases: other names of the command, e.g. "pl"
+    :param arguments: arguments of the command, built with argument()
+    :param help: one line description shown by help
+    :return:
+    """
+
+    def decorate(function: Callable) -> Callable:
+        function.command = (name, aliases, arguments, help)
+        return function
+
+    return decorate
+
+
+def parseOverlayArgument(value: str) -> list:
+    # indicators imports pandas, only when an overlay is given
+    from indicators import parseOverlays
+
+    return parseOverlays(value)
+
+
+class Command:
+    """
+    A command of a section, with the parser of its arguments built once
+    """
+
+    def __init__(
+        self,
+        name: str,
+        aliases: Sequence[str],
+        arguments: Sequence,
+        help: str,
+        handler: Callable,
+    ):
+        self.name = name
+        self.aliases = tuple(aliases)
+        self.help = help
+        self.handler = handler
+        self.parser = argparse.ArgumentParser(prog=name, description=help)
+        for flags, kwargs in arguments:
+            self.parser.add_argument(*flags, **kwargs)
+
+
+class SectionLoop:
+    """
+    Prompt loop of a terminal section, generated from its commands.
+
+    Commands are the methods decorated with @command. They are collected, and
+    their parsers built, once per class; a command line is then dispatched with
+    a dict lookup of its first word (case insensitive). A handler returns False
+    to leave the section, or a SectionLoop to enter it.
+    """
+
+    sectionName: str = "main"
+    commandList: List[Command] = []
+    registry: Dict[str, Command] = {}
+    # command lines that failed : no such command, invalid arguments or a failing handler
+    errorCount: int = 0
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        # handlers by method name, so a subclass can override a command
+        handlers: Dict[str, Callable] = {}
+        for klass in reversed(cls.__mro__):
+            handlers.update(
+                {name: value for name, value in vars(klass).items() if hasattr(value, "command")}
+            )
+
+        cls.commandList = [Command(*handler.command, handler=handler) for handler in handlers.values()]
+        cls.registry = {}
+        for cmd in cls.commandList:
+            for name in (cmd.name, *cmd.aliases):
+                assert name.lower() not in cls.registry, Exception(
+                    f"Command {name} registered twice in {cls.__name__}"
+                )
+                cls.registry[name.lower()] = cmd
+
+    @classmethod
+    def commandNames(cls) -> List[str]:
+        """
+        Names and aliases of the commands, e.g. for completion
+        :return:
+        """
+        return [name for cmd in cls.commandList for name in (cmd.name, *cmd.aliases)]
+
+    def completer(self):
+        from prompt_toolkit.completion import WordCompleter
+
+        return WordCompleter(self.commandNames())
+
+    def runCommand(self, userInput: str) -> Union[bool, "SectionLoop"]:
+        """
+        Runs one command line of the section
+        :param userInput: e.g. "load --ticker IBM"
+        :return: False once the command leaves the section, the section to enter for
+        section commands, True otherwise
+        """
+        words = userInput.split()
+        if not words:
+            return True
+
+        cmd = self.registry.get(words[0].lower())
+        if cmd is None:
+            self.reportError(
+                f"The command selected doesn't exist. Available commands are : {self.commandNames()}"
+            )
+            return True
+
+        try:
+            (args, largs) = cmd.parser.parse_known_args(words[1:])
+        except SystemExit:
+            self.reportError("Invalid arguments")
+            return True
+
+        # a failing command (e.g. offline, rejected API key) doesn't end the session
+        try:
+            result = cmd.handler(self, args)
+        except Exception as error:
+            self.reportError(error)
+            return True
+        return True if result is None else result
+
+    def reportError(self, message: Any) -> None:
+        """
+        Prints the error of a command and counts it, so batch runs exit with an error
+        :param message:
+        :return:
+        """
+        console.print(f"[red]{message}")
+        self.errorCount += 1
+
+    def runLoop(self) -> None:
+        self.runCommand("help")
+
+        continueLoop: bool = True
+        while continueLoop:
+            # the chart windows stay responsive while the prompt waits
+            userInput = session.prompt(
+                f"{self.sectionName}>> ", completer=self.completer(), inputhook=inputhook
+            )
+            result = self.runCommand(userInput)
+            if isinstance(result, SectionLoop):
+                result.runLoop()
+            continueLoop = result is not False
+
+    @command("help", "h", help="Shows this message")
+    def helpCommand(self, args: argparse.Namespace) -> None:
+        console.print(
+            f"[red]Welcome to {self.sectionName} section. Choose from the following choices."
+        )
+        for cmd in self.commandList:
+            aliases = f" ({', '.join(cmd.aliases)})" if cmd.aliases else ""
+            console.print(f" [yellow]{cmd.name}{aliases}[/yellow] : {cmd.help}")
+
+    @command("quit", "q", help="Leaves the section")
+    def quitCommand(self, args: argparse.Namespace) -> bool:
+        console.print(f"[red]Exiting {self.sectionName} section")
+        return False
+
+    @command("cls", help="Clears the screen")
+    def clsCommand(self, args: argparse.Namespace) -> None:
+        os.system("cls||clear")
+
+
+class SourceSectionLoop(SectionLoop):
+    """
+    Section working on one element (stock, currency pair, ...) of a data source.
+    Subclasses add a load command creating classInstance.
+    """
+
+    sourceClassMapping: Dict[str, type] = {}
+    classToUse: Union[type, None] = None
+    classInstance = None
+    # start downloading the daily series on load, turned off for batch runs where
+    # the next command needs the data straight away
+    prefetchOnLoad: bool = True
+
+    def loadSource(self, source: str, **kwargs) -> None:
+        """
+        Creates the data source instance for the loaded element
+        :param source: key of sourceClassMapping
+        :param kwargs: forwarded to the data source class
+        :return:
+        """
+        try:
+            # Check if the source they have chosen is correct
+            assert source in self.sourceClassMapping.keys(), Exception(
+                f"Source {source} not defined. Valid values are: {list(self.sourceClassMapping.keys())}"
+            )
+
+            self.classToUse = self.sourceClassMapping[source]
+            self.classInstance = self.classToUse(**kwargs)
+            # download in the background while the user types the next command
+            if self.prefetchOnLoad:
+                self.classInstance.prefetch()
+        except Exception as error:
+            self.reportError(error)
+
+    @command(
+        "plotLine",
+        "pl",
+        arguments=[
+            argument("--type", type=str, required=False, default="line", choices=["line", "ohlc"]),
+            argument(
+                "--startDate",
+                type=parseWindowArgument,
+                help="The starting date (format YYYY-MM-DD) or a window : 10d, 6m, 1y, ytd, max. Defaults to 1y",
+            ),
+            argument(
+                "--endDate",
+                type=lambda d: datetime.datetime.strptime(d, "%Y-%m-%d"),
+                help="The ending date (format YYYY-MM-DD), defaults to the last trading day",
+            ),
+            argument("--adjust", type=int, help="", default=1),
+            argument(
+                "--overlay",
+                type=parseOverlayArgument,
+                help="Indicators drawn over the chart, e.g. sma:50,ema:200,bollinger:20:2,rsi:14."
+                " Available : sma, ema, rsi, macd, bollinger, atr, volatility (line charts only"
+                " for rsi, macd, atr and volatility)",
+            ),
+        ],
+        help="Plots the closing price, or candles and volume with --type ohlc, of the loaded element",
+    )
+    def plotLineCommand(self, args: argparse.Namespace) -> None:
+        if self.classInstance is None:
+            self.reportError("Nothing loaded. Use load command")
+            return
+
+        try:
+            # the window is resolved when the command runs
+            df = self.classInstance.loadDaily(startDate=args.startDate, endDate=args.endDate)
+            overlays = [
+                (
+                    name,
+                    self.classInstance.indicator(
+                        name, *params, startDate=args.startDate, endDate=args.endDate
+                    ),
+                )
+                for name, params in args.overlay or []
+            ]
+            if args.type == "ohlc":
+                chartName = "plotCandle"
+                fig, ax = self.classInstance.plotCandle(df, volume=True, overlays=overlays)
+            else:
+                chartName = "plotLine"
+                fig, ax = self.classInstance.plotLine(
+                    df, plotGlobalEvents=True, adjust=args.adjust, overlays=overlays
+                )
+            showFigure(fig, f"{self.sectionName}_{self.classInstance.element}_{chartName}")
+        except Exception as err:
+            self.reportError(err)
+
+    @command(
+        "find",
+        "fi",
+        arguments=[argument("--keyword", type=str, required=True)],
+        help="Searches the elements of the data source",
+    )
+    def findCommand(self, args: argparse.Namespace) -> None:
+        from rich_dataframe import rich_dataframe
+
+        console.print(f"Results for : {args.keyword}")
+        rich_dataframe.prettify(self.classToUse.find(args.keyword))
@@ -1,16 +1,79 @@
-from typing import Literal
+from typing import Any, Callable, Literal
 
 import dotenv
-from prompt_toolkit.history import FileHistory
-from rich import console
-from prompt_toolkit import PromptSession
 
 dotenv.load_dotenv()
 
-console = console.Console()
-session = PromptSession(
-    enable_history_search=True, history=FileHistory(".session_history")
-)
+
+class LazyService:
+    """
+    Stands in for a terminal service (console, prompt session) and creates it on
+    first attribute access, so importing a module that uses it doesn't set up the
+    terminal
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self.factory = factory
+        self.instance = None
+
+    def get(self) -> Any:
+        if self.instance is None:
+            self.instance = self.factory()
+        return self.instance
+
+    def reset(self) -> None:
+        self.instance = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+
+def createConsole():
+    from rich.console import Console
+
+    return Console()
+
+
+def createSession():
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.history import FileHistory
+
+    return PromptSession(
+        enable_history_search=True, history=FileHistory(".session_history")
+    )
+
+
+def createPlotService():
+    from plotService import PlotService
+
+    return PlotService()
+
+
+console = LazyService(createConsole)
+session = LazyService(createSession)
+# created by the first chart, so matplotlib is only imported when plotting
+plots = LazyService(createPlotService)
+
+
+def inputhook(context) -> None:
+    """
+    prompt_toolkit input hook keeping the chart windows responsive while the
+    prompt waits for input
+    :param context:
+    :return:
+    """
+    if plots.instance is not None:
+        plots.instance.inputhook(context)
+
+
+def showFigure(fig, name: str) -> None:
+    """
+    Shows fig without blocking, or in file output mode saves it as <name>.png
+    :param fig: matplotlib figure
+    :param name: file name without extension
+    :return:
+    """
+    plots.show(fig, name)
 
 
 def findFutureValue(
@@ -27,12 +90,6 @@ def findFutureValue(
     ],
     [365, 12, 4, 2, 1]))
     M = rateOfCompounding/compoundingFreqMapping[compoundingFreq]
-    print(M)
 
     finalValue: float = principle * (1+(rateOfCompounding*0.01)/M)**(M*numYears)
     return finalValue
-
-
-
-ans = findFutureValue(10e3, 2, rateOfCompounding=8.0, compoundingFreq='quaterly')
-print(f'{ans:,}')
@@ -0,0 +1,35 @@
+from typing import List
+
+from prompt_toolkit.completion import Completer, Completion, WordCompleter
+
+from symbolUniverse import SymbolUniverse
+
+
+class SymbolCompleter(Completer):
+    """
+    Completes command names, and ticker symbols from the local listing after
+    --ticker / -t / --keyword
+    """
+
+    symbolOptions = ("--ticker", "-t", "--keyword")
+
+    def __init__(self, commands: List[str], universe: SymbolUniverse):
+        self.commandCompleter = WordCompleter(commands)
+        self.universe = universe
+
+    def get_completions(self, document, complete_event):
+        word = document.get_word_before_cursor(WORD=True)
+        previousWords = document.text_before_cursor[: len(document.text_before_cursor) - len(word)].split()
+        if not previousWords or previousWords[-1] not in self.symbolOptions:
+            yield from self.commandCompleter.get_completions(document, complete_event)
+            return
+
+        # never download the listing while typing
+        index = self.universe.index(download=False) if word else None
+        if index is None:
+            return
+        rows, scores = index.searchRows(word, limit=10)
+        for row in rows:
+            yield Completion(
+                index.symbols[row], start_position=-len(word), display_meta=index.names[row]
+            )
@@ -1,25 +1,32 @@
-import datetime
 import os
 from typing import Union, Dict, Literal
 
 import pandas as pd
-import requests
 from loguru import logger
 
+from parsers import emptyFrame, parseTimeSeries
+from rateLimiter import AlphaVantageScheduler, alphaVantageTransport
 from sources import DataSourceBase
 
 
 class AlphaVantageCrytpoDataSourceBase(DataSourceBase):
-    physical_currency_df = pd.read_csv("./av_physical_currency_list.csv")
-    digital_currency_df = pd.read_csv("./av_physical_currency_list.csv")
-
+    assetClass: str = "crypto"
     apiURL: str = "https://www.alphavantage.co/query?"
     apiKeyName: str = "ALPHA_VANTAGE_API_KEY"
     apiKey: str = None
+    sourceName: str = "alphavantage"
+    dataType: Literal["json", "csv"] = os.environ.get(DataSourceBase.dataTypeKeyName, "json")
+    dailyFunctionName: str = "TIME_SERIES_DAILY"
+    transport: AlphaVantageScheduler = alphaVantageTransport
     outputSize: Literal["full", "compact"] = "full"
     isValidElement: bool = False
     element: Union[str, None] = None
 
+    @classmethod
+    def reset(cls) -> None:
+        super().reset()
+        cls.dataType = os.environ.get(cls.dataTypeKeyName, "json")
+
     def __init__(self, crytpoName: str):
         # check if API key is present in environment variable or not
         if not os.environ.get(self.apiKeyName):
@@ -38,55 +45,25 @@ class AlphaVantageCrytpoDataSourceBase(DataSourceBase):
 
         self.isValidElement = True
 
-    def loadDaily(
-        self,
-        startDate: datetime.date = datetime.datetime.today()
-        - datetime.timedelta(days=366),
-        endDate: datetime.date = datetime.datetime.today(),
-    ) -> pd.DataFrame:
-        """
-        Function returns the daily OHLC data
-        :param startDate:
-        :param endDate:
-        :return:
-        """
-        assert self.isValidElement, Exception("Select valid symbol")
-        assert startDate < endDate, Exception("Start date should be less than end date")
-
+    def dailyURL(self, outputSize: Literal["full", "compact"]) -> str:
         # function name and symbol name
-        functionName: str = "TIME_SERIES_DAILY"
+        functionName: str = self.dailyFunctionName
         symbol: str = self.element
 
-        url = f"{self.apiURL}function={functionName}&symbol={symbol}&outputsize={self.outputSize}&apikey={self.apiKey}&datatype=json"
-        logger.debug(f"URL for daily time series is : {url}")
-        r = requests.get(url)
-        data: Dict = r.json()
+        return f"{self.apiURL}function={functionName}&symbol={symbol}&outputsize={outputSize}&apikey={self.apiKey}&datatype={self.dataType}"
 
-        if "Error Message" in data:
-            logger.exception(
-                f"Error getting daily stock prices for : {self.element} from ALPHA_VANTAGE. Error is : {data['Error Message']}"
+    def parseDaily(self, data: Dict) -> pd.DataFrame:
+        if "Time Series (Daily)" not in data:
+            logger.error(
+                f"Error getting daily prices for : {self.element} from ALPHA_VANTAGE. Error is : {data.get('Error Message', data)}"
             )
-            return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+            return emptyFrame(self.dailyColumns)
         else:
-            # load data in dictionary
-            df = pd.DataFrame.from_dict(data["Time Series (Daily)"], orient="index")
-            # rename columns and sort data
-            df.columns = ["Open", "High", "Low", "Close", "Volume"]
-            for column in df.columns:
-                df[column] = df[column].astype(float)
-            df.sort_index(inplace=True)
-
-            # convert index to datetime
-            df.index = pd.to_datetime(df.index)
-
-            # filter data
-            df = df[(df.index >= str(startDate)) & (df.index <= str(endDate))]
-            # Convert to datetime
-
-            self.df = df
+            # parse straight into float64 columns and a datetime64 index
+            df = parseTimeSeries(data["Time Series (Daily)"], self.dailyColumns)
             return df
 
-    def checkSymbolExists(self, symbolName: str) -> bool:
+    def checkSymbolURL(self, symbolName: str) -> str:
         # To check if symbol exists, then it
         functionName: str = "GLOBAL_QUOTE"
         symbol: str = symbolName
@@ -95,18 +72,18 @@ class AlphaVantageCrytpoDataSourceBase(DataSourceBase):
             f"{self.apiURL}function={functionName}&symbol={symbol}&apikey={self.apiKey}"
         )
         logger.debug(f"URL for checking if symbol exists is : {url}")
-        r = requests.get(url)
-        data: Dict = r.json()
+        return url
 
+    def checkSymbolExists(self, symbolName: str) -> bool:
+        data: Dict = self.transport.getJSON(self.checkSymbolURL(symbolName))
         return bool(data["Global Quote"])  # check if
 
+    async def acheckSymbolExists(self, symbolName: str) -> bool:
+        data: Dict = await self.transport.agetJSON(self.checkSymbolURL(symbolName))
+        return bool(data["Global Quote"])
+
     @classmethod
-    def find(cls, crytpoName: str) -> pd.DataFrame:
-        """
-        Check if the stock exists exists
-        :param crytpoName:
-        :return:
-        """
+    def findURL(cls, crytpoName: str) -> str:
         # function name and symbol name
         functionName: str = "SYMBOL_SEARCH"
         symbol: str = crytpoName
@@ -115,9 +92,10 @@ class AlphaVantageCrytpoDataSourceBase(DataSourceBase):
             f"{cls.apiURL}function={functionName}&keywords={symbol}&apikey={cls.apiKey}"
         )
         logger.debug(f"URL for finding stocks is : {url}")
-        r = requests.get(url)
-        data: Dict = r.json()
+        return url
 
+    @classmethod
+    def parseFind(cls, data: Dict) -> pd.DataFrame:
         df = pd.DataFrame(data["bestMatches"])
         df.columns = [
             "Symbol",
@@ -131,3 +109,16 @@ class AlphaVantageCrytpoDataSourceBase(DataSourceBase):
             "MatchScore",
         ]
         return df
+
+    @classmethod
+    def find(cls, crytpoName: str) -> pd.DataFrame:
+        """
+        Check if the stock exists exists
+        :param crytpoName:
+        :return:
+        """
+        return cls.parseFind(cls.transport.getJSON(cls.findURL(crytpoName)))
+
+    @classmethod
+    async def afind(cls, crytpoName: str) -> pd.DataFrame:
+        return cls.parseFind(await cls.transport.agetJSON(cls.findURL(crytpoName)))
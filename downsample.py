@@ -0,0 +1,91 @@
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# narrowest candle drawn, in pixels, before plotCandle switches to a longer period
+candlePixels: float = 1.5
+# candle periods tried by candleRule, shortest first (None keeps daily candles)
+candleRules: List[Tuple[Union[str, None], str]] = [
+    (None, "Daily"),
+    ("W-FRI", "Weekly"),
+    ("ME", "Monthly"),
+    ("QE", "Quarterly"),
+    ("YE", "Yearly"),
+]
+ohlcAggregation: Dict[str, str] = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Volume": "sum",
+}
+
+
+def pixelWidth(ax) -> int:
+    """
+    Width of the axes in pixels, i.e. the number of distinct x positions it can draw
+    :param ax: matplotlib axes
+    :return:
+    """
+    return max(int(ax.bbox.width), 1)
+
+
+def minMaxDownsample(df: pd.DataFrame, column: str, buckets: int) -> pd.DataFrame:
+    """
+    Keeps the rows holding the min and the max of column in each of buckets
+    equal-sized groups of consecutive rows, plus the first and last rows. With one
+    bucket per pixel the line drawn is the same as with every row, since every
+    peak and trough is kept.
+    :param df: frame sorted by date
+    :param column: e.g. "Close"
+    :param buckets: number of groups, e.g. pixelWidth(ax)
+    :return: df itself when it has no more than 2 rows per bucket
+    """
+    nRows = len(df)
+    if nRows <= 2 * buckets:
+        return df
+
+    bucketSize = -(-nRows // buckets)
+    nBuckets = -(-nRows // bucketSize)
+    values = df[column].to_numpy(dtype=np.float64)
+
+    # pad the last bucket, NaN never wins the min or the max
+    padded = np.full(nBuckets * bucketSize, np.nan)
+    padded[:nRows] = values
+    padded = padded.reshape(nBuckets, bucketSize)
+    offsets = np.arange(nBuckets) * bucketSize
+    minPositions = offsets + np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1)
+    maxPositions = offsets + np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1)
+
+    positions = np.unique(np.concatenate([[0, nRows - 1], minPositions, maxPositions]))
+    return df.iloc[positions[positions < nRows]]
+
+
+def candleRule(df: pd.DataFrame, maxCandles: int) -> Tuple[Union[str, None], str]:
+    """
+    Picks the shortest candle period giving no more than maxCandles candles
+    :param df: daily bars
+    :param maxCandles: e.g. pixelWidth(ax) / candlePixels
+    :return: (resample rule, label), the rule is None for daily candles
+    """
+    nDays = (df.index[-1] - df.index[0]).days + 1 if len(df) else 0
+    periodDays = {None: None, "W-FRI": 7, "ME": 30.4, "QE": 91.3, "YE": 365.25}
+    for rule, label in candleRules:
+        count = len(df) if rule is None else nDays / periodDays[rule]
+        if count <= maxCandles:
+            return rule, label
+    return candleRules[-1]
+
+
+def resampleOHLC(df: pd.DataFrame, rule: Union[str, None]) -> pd.DataFrame:
+    """
+    Aggregates daily bars into longer candles
+    :param df: daily bars with some of the Open, High, Low, Close, Volume columns
+    :param rule: pandas resample rule, e.g. "W-FRI", None returns df
+    :return:
+    """
+    if rule is None:
+        return df
+    aggregation = {column: how for column, how in ohlcAggregation.items() if column in df.columns}
+    return df.resample(rule).agg(aggregation).dropna(subset=["Close"])
@@ -0,0 +1,61 @@
+import os
+from pathlib import Path
+from typing import Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+class EventIndex:
+    """
+    Catalogue of global events (date, name) annotated on the price charts.
+
+    The events are kept in date-sorted arrays, so the events falling in a price
+    series are found with two binary searches and their price is interpolated
+    with np.interp, without merging the catalogue into the series.
+    """
+
+    eventsFileKeyName: str = "OPENTERMINAL_EVENTS_FILE"
+    defaultPath: Path = Path(__file__).resolve().parent / "global_events.csv"
+
+    def __init__(self, dates: np.ndarray, names: np.ndarray):
+        """
+        :param dates: datetime64 array of the event dates
+        :param names: array of the event names
+        """
+        order = np.argsort(dates, kind="stable")
+        self.dates: np.ndarray = dates.astype("datetime64[ns]")[order]
+        self.names: np.ndarray = np.asarray(names, dtype=object)[order]
+
+    @classmethod
+    def fromFile(cls, path: Union[str, Path, None] = None) -> "EventIndex":
+        """
+        Reads a csv catalogue with an eventDate (YYYY-MM-DD) and an eventName column
+        :param path: defaults to OPENTERMINAL_EVENTS_FILE, then global_events.csv
+        :return:
+        """
+        path = path or os.environ.get(cls.eventsFileKeyName) or cls.defaultPath
+        df = pd.read_csv(path, parse_dates=["eventDate"])
+        return cls(df["eventDate"].to_numpy(dtype="datetime64[ns]"), df["eventName"].to_numpy())
+
+    def locate(
+        self, index: pd.DatetimeIndex, values: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the events between the first and last date of a series, with the
+        value of the series interpolated at each event date
+        :param index: sorted dates of the series
+        :param values: values of the series, e.g. the closing prices
+        :return: (dates, names, values) of the events
+        """
+        if len(index) == 0:
+            return self.dates[:0], self.names[:0], np.empty(0)
+
+        seriesDates = index.to_numpy(dtype="datetime64[ns]")
+        start = np.searchsorted(self.dates, seriesDates[0], side="left")
+        end = np.searchsorted(self.dates, seriesDates[-1], side="right")
+        dates = self.dates[start:end]
+        eventValues = np.interp(
+            dates.view(np.int64), seriesDates.view(np.int64), np.asarray(values, dtype=np.float64)
+        )
+        return dates, self.names[start:end], eventValues
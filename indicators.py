@@ -0,0 +1,159 @@
+import argparse
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# trading days per year, to annualize the volatility
+periodsPerYear: int = 252
+
+
+def sma(df: pd.DataFrame, window: int = 50) -> pd.DataFrame:
+    """
+    Simple moving average of the closing price
+    :param df: daily bars
+    :param window: number of bars
+    :return:
+    """
+    return pd.DataFrame({f"SMA({window})": df["Close"].rolling(window).mean()})
+
+
+def ema(df: pd.DataFrame, span: int = 20) -> pd.DataFrame:
+    """
+    Exponential moving average of the closing price
+    :param df:
+    :param span: number of bars, alpha = 2 / (span + 1)
+    :return:
+    """
+    return pd.DataFrame({f"EMA({span})": df["Close"].ewm(span=span, adjust=False).mean()})
+
+
+def rsi(df: pd.DataFrame, window: int = 14) -> pd.DataFrame:
+    """
+    Relative strength index, with Wilder's smoothing of the gains and losses
+    :param df:
+    :param window:
+    :return: values between 0 and 100
+    """
+    change = df["Close"].diff()
+    averageGain = change.clip(lower=0).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    averageLoss = (-change).clip(lower=0).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    return pd.DataFrame({f"RSI({window})": 100 - 100 / (1 + averageGain / averageLoss)})
+
+
+def macd(df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9) -> pd.DataFrame:
+    """
+    Moving average convergence divergence
+    :param df:
+    :param fast: span of the fast EMA
+    :param slow: span of the slow EMA
+    :param signal: span of the EMA of the MACD line
+    :return: MACD, signal and histogram columns
+    """
+    close = df["Close"]
+    line = close.ewm(span=fast, adjust=False).mean() - close.ewm(span=slow, adjust=False).mean()
+    signalLine = line.ewm(span=signal, adjust=False).mean()
+    name = f"MACD({fast},{slow},{signal})"
+    return pd.DataFrame(
+        {name: line, f"{name} Signal": signalLine, f"{name} Histogram": line - signalLine}
+    )
+
+
+def bollinger(df: pd.DataFrame, window: int = 20, width: float = 2) -> pd.DataFrame:
+    """
+    Bollinger bands : moving average of the close plus or minus width standard deviations
+    :param df:
+    :param window:
+    :param width: number of standard deviations
+    :return: middle, upper and lower band columns
+    """
+    rolling = df["Close"].rolling(window)
+    middle = rolling.mean()
+    deviation = rolling.std(ddof=0) * width
+    name = f"BB({window},{width:g})"
+    return pd.DataFrame(
+        {name: middle, f"{name} Upper": middle + deviation, f"{name} Lower": middle - deviation}
+    )
+
+
+def atr(df: pd.DataFrame, window: int = 14) -> pd.DataFrame:
+    """
+    Average true range, with Wilder's smoothing
+    :param df: bars with High, Low and Close columns
+    :param window:
+    :return:
+    """
+    high = df["High"].to_numpy(dtype=np.float64)
+    low = df["Low"].to_numpy(dtype=np.float64)
+    previousClose = df["Close"].shift(1).to_numpy(dtype=np.float64)
+    trueRange = np.fmax(
+        high - low, np.fmax(np.abs(high - previousClose), np.abs(low - previousClose))
+    )
+    average = pd.Series(trueRange, index=df.index).ewm(
+        alpha=1 / window, adjust=False, min_periods=window
+    ).mean()
+    return pd.DataFrame({f"ATR({window})": average})
+
+
+def volatility(df: pd.DataFrame, window: int = 20) -> pd.DataFrame:
+    """
+    Annualized rolling standard deviation of the daily log returns
+    :param df:
+    :param window:
+    :return:
+    """
+    logReturns = np.log(df["Close"]).diff()
+    return pd.DataFrame(
+        {f"Volatility({window})": logReturns.rolling(window).std() * np.sqrt(periodsPerYear)}
+    )
+
+
+# name -> (function, drawn on the price axis)
+indicatorFunctions: Dict[str, Tuple[Callable[..., pd.DataFrame], bool]] = {
+    "sma": (sma, True),
+    "ema": (ema, True),
+    "rsi": (rsi, False),
+    "macd": (macd, False),
+    "bollinger": (bollinger, True),
+    "atr": (atr, False),
+    "volatility": (volatility, False),
+}
+
+
+def isPriceScale(name: str) -> bool:
+    return indicatorFunctions[name][1]
+
+
+def computeIndicator(df: pd.DataFrame, name: str, *params: float) -> pd.DataFrame:
+    """
+    Computes an indicator over daily bars
+    :param df: daily bars sorted by date
+    :param name: key of indicatorFunctions, e.g. "sma"
+    :param params: positional parameters of the indicator, e.g. 50
+    :return: frame with one column per line of the indicator, indexed like df
+    """
+    assert name in indicatorFunctions, Exception(
+        f"Indicator {name} not defined. Valid values are: {list(indicatorFunctions.keys())}"
+    )
+    return indicatorFunctions[name][0](df, *params)
+
+
+def parseOverlays(value: str) -> List[Tuple[str, Tuple[float, ...]]]:
+    """
+    argparse type of overlay arguments, e.g. "sma:50,ema:200,bollinger:20:2"
+    :param value: comma separated name[:param[:param...]]
+    :return: [(name, params), ...]
+    """
+    overlays = []
+    for spec in value.split(","):
+        name, *params = spec.strip().lower().split(":")
+        if name not in indicatorFunctions:
+            raise argparse.ArgumentTypeError(
+                f"Unknown indicator {name}. Valid values are: {list(indicatorFunctions.keys())}"
+            )
+        try:
+            params = tuple(int(x) if x.isdigit() else float(x) for x in params)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid parameters for {name} : {spec}")
+        overlays.append((name, params))
+    return overlays
@@ -0,0 +1,91 @@
+import itertools
+from typing import BinaryIO, Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+def emptyFrame(columns: List[str]) -> pd.DataFrame:
+    """
+    Returns an empty frame with float64 columns and a datetime64 index
+    :param columns:
+    :return:
+    """
+    return pd.DataFrame(
+        np.empty((0, len(columns))),
+        index=pd.DatetimeIndex([], dtype="datetime64[ns]"),
+        columns=columns,
+    )
+
+
+def parseTimeSeries(series: Dict[str, Dict[str, str]], columns: List[str]) -> pd.DataFrame:
+    """
+    Parses an Alpha Vantage time series object, e.g. data["Time Series (Daily)"],
+    into a frame sorted by date.
+
+    The values are converted straight into one float64 array with np.fromiter and
+    the ISO dates into a datetime64 array, instead of building an object frame and
+    converting it column by column.
+    :param series: date -> {"1. open": "...", "2. high": "...", ...}
+    :param columns: names of the leading fields of each bar, in payload order
+    :return:
+    """
+    nRows, nColumns = len(series), len(columns)
+    if nRows == 0:
+        return emptyFrame(columns)
+
+    dates = np.array(list(series.keys()), dtype="datetime64[D]")
+    values = np.fromiter(
+        itertools.chain.from_iterable(
+            itertools.islice(bar.values(), nColumns) for bar in series.values()
+        ),
+        dtype=np.float64,
+        count=nRows * nColumns,
+    ).reshape(nRows, nColumns)
+
+    return buildFrame(dates, values, columns)
+
+
+def parseTimeSeriesCSV(body: BinaryIO, columns: List[str]) -> pd.DataFrame:
+    """
+    Parses an Alpha Vantage datatype=csv time series with the C reader of
+    pd.read_csv, consuming body as it is read.
+    :param body: stream with a header row and "timestamp,open,high,low,close[,volume]" rows
+    :param columns: names of the fields following the timestamp, in payload order
+    :return:
+    """
+    df = pd.read_csv(
+        body,
+        engine="c",
+        header=0,
+        names=["timestamp"] + columns,
+        usecols=range(len(columns) + 1),
+        dtype={column: np.float64 for column in columns},
+    )
+    if df.empty:
+        return emptyFrame(columns)
+
+    dates = df["timestamp"].to_numpy(dtype="datetime64[D]")
+    return buildFrame(dates, df[columns].to_numpy(dtype=np.float64), columns)
+
+
+def buildFrame(dates: np.ndarray, values: np.ndarray, columns: List[str]) -> pd.DataFrame:
+    """
+    Returns a frame sorted by date from parallel date and value arrays
+    :param dates: datetime64 array
+    :param values: float64 array of shape (len(dates), len(columns))
+    :param columns:
+    :return:
+    """
+    # the API returns the newest bar first
+    if len(dates) > 1 and dates[0] > dates[-1]:
+        dates, values = dates[::-1], values[::-1]
+    if not np.all(dates[1:] >= dates[:-1]):
+        order = np.argsort(dates, kind="stable")
+        dates, values = dates[order], values[order]
+
+    return pd.DataFrame(
+        np.ascontiguousarray(values),
+        index=pd.DatetimeIndex(dates.astype("datetime64[ns]")),
+        columns=columns,
+    )
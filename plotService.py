@@ -0,0 +1,156 @@
+import os
+import re
+import time
+from typing import List, Set, Tuple, Union
+
+import matplotlib
+import numpy as np
+from matplotlib import pyplot as plt
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+
+from common import console
+
+
+class PlotService:
+    """
+    Owns the chart windows of the terminal.
+
+    Each kind of chart (plotLine, plotCandle, ...) gets one persistent figure,
+    reused by the next command of that kind : price lines are updated in place
+    and the other artists redrawn, so repeated plots don't pile up figures.
+    Windows are shown without blocking the prompt, which keeps them responsive
+    through inputhook. In file output mode (Agg backend, for batch runs and
+    headless servers) the charts are saved as png files instead.
+    """
+
+    figureDirectoryKeyName: str = "OPENTERMINAL_FIGURE_DIR"
+
+    def __init__(self, figureDirectory: Union[str, None] = None):
+        """
+        :param figureDirectory: saves the charts in this directory instead of showing
+        them (env: OPENTERMINAL_FIGURE_DIR)
+        """
+        self.figureDirectory: Union[str, None] = None
+        # number of charts saved, prefixed to the file names so none is overwritten
+        self.savedCount: int = 0
+        figureDirectory = figureDirectory or os.environ.get(self.figureDirectoryKeyName)
+        if figureDirectory:
+            self.useFileOutput(figureDirectory)
+
+    def useFileOutput(self, figureDirectory: str) -> None:
+        """
+        Switches to the Agg backend, the charts are saved in figureDirectory
+        :param figureDirectory:
+        :return:
+        """
+        matplotlib.use("Agg")
+        self.figureDirectory = figureDirectory
+
+    def figure(self, name: str) -> Figure:
+        """
+        Returns the figure of a kind of chart, created if it doesn't exist or its
+        window was closed
+        :param name: e.g. "plotLine"
+        :return:
+        """
+        return plt.figure(num=name)
+
+    def axes(self, name: str) -> Tuple[Figure, Axes]:
+        """
+        Returns the figure of a single axes chart and its axes
+        :param name:
+        :return:
+        """
+        fig = self.figure(name)
+        ax = fig.axes[0] if fig.axes else fig.add_subplot()
+        return fig, ax
+
+    @staticmethod
+    def clearAnnotations(ax: Axes) -> None:
+        """
+        Removes the scatter points and texts of ax, keeping its lines
+        :param ax:
+        :return:
+        """
+        for artist in [*ax.collections, *ax.texts]:
+            artist.remove()
+
+    @staticmethod
+    def updateLine(ax: Axes, gid: str, x, y: np.ndarray, **style) -> Line2D:
+        """
+        Updates the data of the line gid of ax in place, or plots it the first time
+        :param ax:
+        :param gid: identifies the line, also used as its label
+        :param x:
+        :param y:
+        :param style: Line2D properties, e.g. color
+        :return:
+        """
+        for line in ax.get_lines():
+            if line.get_gid() == gid:
+                line.set_data(x, y)
+                line.set(**style)
+                ax.relim()
+                ax.autoscale_view()
+                return line
+
+        (line,) = ax.plot(x, y, gid=gid, label=gid, **style)
+        return line
+
+    @staticmethod
+    def removeLines(ax: Axes, keep: Set[str]) -> None:
+        """
+        Removes the lines of ax whose gid isn't in keep
+        :param ax:
+        :param keep: gids of the lines to keep
+        :return:
+        """
+        for line in ax.get_lines():
+            if line.get_gid() not in keep:
+                line.remove()
+
+    @staticmethod
+    def legendHandles(fig: Figure) -> List[Line2D]:
+        """
+        Lines of every axes of fig, for one legend covering twin axes
+        :param fig:
+        :return:
+        """
+        return [line for ax in fig.axes for line in ax.get_lines()]
+
+    def show(self, fig: Figure, name: str) -> None:
+        """
+        Shows fig without blocking, or in file output mode saves it as
+        <figureDirectory>/<sequence number>_<name>.png
+        :param fig:
+        :param name: file name without extension
+        :return:
+        """
+        if self.figureDirectory is not None:
+            os.makedirs(self.figureDirectory, exist_ok=True)
+            self.savedCount += 1
+            fileName = re.sub(r"[^A-Za-z0-9.\-]+", "_", name)
+            path = os.path.join(self.figureDirectory, f"{self.savedCount:03d}_{fileName}.png")
+            fig.savefig(path, bbox_inches="tight")
+            console.print(f"Saved chart to : {path}")
+            return
+
+        fig.canvas.draw_idle()
+        plt.show(block=False)
+        fig.canvas.flush_events()
+
+    def inputhook(self, context) -> None:
+        """
+        prompt_toolkit input hook : processes the events of the chart windows until
+        the user types something
+        :param context: prompt_toolkit InputHookContext
+        :return:
+        """
+        if self.figureDirectory is not None or not plt.get_fignums():
+            return
+        while not context.input_is_ready():
+            for number in plt.get_fignums():
+                plt.figure(number).canvas.flush_events()
+            time.sleep(0.05)
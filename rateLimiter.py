@@ -0,0 +1,227 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from typing import Any, BinaryIO, Callable, Dict, Union
+
+import dotenv
+import httpx
+import requests
+from loguru import logger
+
+from transport import HTTPTransport, defaultTransport
+
+##############################
+# Load environment variables #
+##############################
+# ALPHA_VANTAGE_TIER is read when the shared scheduler is created on import
+dotenv.load_dotenv()
+
+
+class ThrottleError(Exception):
+    pass
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket. Tokens are refilled continuously at
+    ratePerMinute / 60 per second, up to burst tokens.
+    """
+
+    def __init__(self, ratePerMinute: float, burst: Union[int, None] = None):
+        self.rate: float = ratePerMinute / 60.0
+        self.burst: float = float(burst or max(1, int(ratePerMinute // 60)))
+        self.tokens: float = self.burst
+        self.updatedAt: float = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updatedAt) * self.rate)
+        self.updatedAt = now
+
+    def _tryAcquire(self) -> float:
+        """
+        Consumes a token if one is available
+        :return: 0 if a token was consumed, else the time to wait for the next one
+        """
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> None:
+        """
+        Blocks until a token is available and consumes it
+        :return:
+        """
+        while waitTime := self._tryAcquire():
+            time.sleep(waitTime)
+
+    async def aacquire(self) -> None:
+        """
+        Waits without blocking the event loop until a token is available and consumes it
+        :return:
+        """
+        while waitTime := self._tryAcquire():
+            await asyncio.sleep(waitTime)
+
+    def drain(self) -> None:
+        """
+        Empties the bucket, used when the server reports that we are throttled
+        :return:
+        """
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0)
+
+
+class AlphaVantageScheduler:
+    """
+    Schedules Alpha Vantage requests at the rate allowed by the API key tier.
+
+    Throttle payloads ("Note" / "Information" about the call frequency) are
+    detected and the request is requeued behind the bucket instead of being
+    handed to the caller. Exposes the same interface as HTTPTransport.
+    """
+
+    # requests per minute allowed for each API key tier
+    tiers: Dict[str, int] = {
+        "free": 5,
+        "premium75": 75,
+        "premium150": 150,
+        "premium300": 300,
+        "premium600": 600,
+        "premium1200": 1200,
+    }
+    tierKeyName: str = "ALPHA_VANTAGE_TIER"
+    throttleKeys = ("Note", "Information")
+    throttlePattern = re.compile(r"call frequency|rate limit|per (day|minute|second)", re.I)
+    # throttles that clear within a minute, anything else is the daily quota
+    retryablePattern = re.compile(r"call frequency|per (minute|second)", re.I)
+
+    def __init__(
+        self,
+        transport: HTTPTransport,
+        tier: Union[str, None] = None,
+        maxRequeues: int = 5,
+    ):
+        """
+        :param transport: HTTP transport used to send the requests
+        :param tier: one of tiers (env: ALPHA_VANTAGE_TIER), defaults to "free"
+        :param maxRequeues: number of times a throttled request is requeued
+        """
+        self.transport: HTTPTransport = transport
+        self.maxRequeues: int = maxRequeues
+        # explicit tier, read from the environment by configure otherwise
+        self.tierSetting: Union[str, None] = tier
+        self.tier: Union[str, None] = None
+        self.configure()
+
+    def configure(self) -> None:
+        """
+        Reads the API key tier and sizes the token bucket for it. The bucket, and
+        the quota already used, is kept if the tier didn't change.
+        :return:
+        """
+        tier = self.tierSetting or os.environ.get(self.tierKeyName, "free")
+        assert tier in self.tiers, Exception(
+            f"Unknown {self.tierKeyName} {tier}. Valid values are : {list(self.tiers.keys())}"
+        )
+        if tier != self.tier:
+            self.tier = tier
+            self.bucket: TokenBucket = TokenBucket(self.tiers[tier])
+
+    def throttleMessage(self, data: Dict) -> Union[str, None]:
+        """
+        Returns the throttle message if the payload is a throttle response
+        :param data:
+        :return:
+        """
+        for key in self.throttleKeys:
+            message = data.get(key)
+            if isinstance(message, str) and self.throttlePattern.search(message):
+                return message
+        return None
+
+    def handleThrottle(self, data: Dict, attempt: int) -> bool:
+        """
+        Checks the payload for a throttle response
+        :param data:
+        :param attempt: number of the current attempt, starting at 0
+        :return: True if the request must be requeued, False if data can be returned
+        """
+        message = self.throttleMessage(data)
+        if message is None:
+            return False
+        if not self.retryablePattern.search(message):
+            raise ThrottleError(message)
+
+        logger.warning(
+            f"Alpha Vantage throttled the request, requeueing ({attempt + 1}/{self.maxRequeues})"
+        )
+        self.bucket.drain()
+        return True
+
+    def getJSON(self, url: str) -> Dict:
+        for attempt in range(self.maxRequeues + 1):
+            self.bucket.acquire()
+            data: Dict = self.transport.getJSON(url)
+            if not self.handleThrottle(data, attempt):
+                return data
+
+        raise ThrottleError(f"Request still throttled after {self.maxRequeues} requeues")
+
+    async def agetJSON(self, url: str) -> Dict:
+        for attempt in range(self.maxRequeues + 1):
+            await self.bucket.aacquire()
+            data: Dict = await self.transport.agetJSON(url)
+            if not self.handleThrottle(data, attempt):
+                return data
+
+        raise ThrottleError(f"Request still throttled after {self.maxRequeues} requeues")
+
+    def getCSV(self, url: str, parseFunction: Callable[[BinaryIO], Any]) -> Union[Any, Dict]:
+        for attempt in range(self.maxRequeues + 1):
+            self.bucket.acquire()
+            result = self.transport.getCSV(url, parseFunction)
+            if not isinstance(result, dict) or not self.handleThrottle(result, attempt):
+                return result
+
+        raise ThrottleError(f"Request still throttled after {self.maxRequeues} requeues")
+
+    async def agetCSV(
+        self, url: str, parseFunction: Callable[[BinaryIO], Any]
+    ) -> Union[Any, Dict]:
+        for attempt in range(self.maxRequeues + 1):
+            await self.bucket.aacquire()
+            result = await self.transport.agetCSV(url, parseFunction)
+            if not isinstance(result, dict) or not self.handleThrottle(result, attempt):
+                return result
+
+        raise ThrottleError(f"Request still throttled after {self.maxRequeues} requeues")
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        self.bucket.acquire()
+        return self.transport.get(url, **kwargs)
+
+    async def aget(self, url: str, **kwargs) -> httpx.Response:
+        await self.bucket.aacquire()
+        return await self.transport.aget(url, **kwargs)
+
+    def close(self) -> None:
+        self.transport.close()
+
+    def reset(self) -> None:
+        self.transport.reset()
+        self.configure()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+# scheduler shared by every Alpha Vantage source so they draw from the same quota
+alphaVantageTransport: AlphaVantageScheduler = AlphaVantageScheduler(defaultTransport)
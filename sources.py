@@ -1,19 +1,28 @@
+import asyncio
+import datetime
+import os
 from abc import ABC, abstractmethod
-from typing import Union, List
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Literal, Tuple, Union, List
 
 import dotenv
-import matplotlib.dates as mdates
-import mplfinance as mpl
+import numpy as np
 import pandas as pd
-from adjustText import adjust_text
 from loguru import logger
-from matplotlib import pyplot as plt
-from common import console
+
+from cache import CachePolicy
+from common import plots
+from downsample import candlePixels, candleRule, minMaxDownsample, pixelWidth, resampleOHLC
+from globalEvents import EventIndex
+from indicators import computeIndicator, isPriceScale
+from parsers import emptyFrame, parseTimeSeriesCSV
+from store import TimeSeriesStore
+from transport import HTTPTransport, defaultTransport
+from windows import DateLike, resolveWindow
 
 ##############################
 # Load environment variables #
 ##############################
-console.log("Loading environment")
 dotenv.load_dotenv()
 
 
@@ -25,26 +34,548 @@ class DataSourceBase(ABC):
     apiKeyName: Union[str, None] = None
     apiKey: Union[str, None] = None
     apiURL: Union[str, None] = None
+    sourceName: Union[str, None] = None
+    dailyFunctionName: Union[str, None] = None
+    dailyColumns: List[str] = ["Open", "High", "Low", "Close", "Volume"]
+    # "csv" streams the daily series into the C csv reader, if the API supports it
+    dataType: Literal["json", "csv"] = "json"
+    dataTypeKeyName: str = "ALPHA_VANTAGE_DATATYPE"
+    isValidElement: bool = False
+    compactWindowSize: int = 100  # number of bars returned by outputsize=compact
+    # full daily history of the element, sorted by date, and when it must be reloaded
+    df: Union[pd.DataFrame, None] = None
+    dfExpiresAt: Union[datetime.datetime, None] = None
+    # a history that couldn't be refreshed is downloaded again after this delay, so
+    # the commands of a session (and the overlays of one chart) don't each retry
+    refreshRetryInterval: datetime.timedelta = datetime.timedelta(minutes=1)
+
+    # stored series are laid out as <assetClass>/<sourceName>/<element>
+    assetClass: Union[str, None] = None
+    # canonical on-disk store of the daily series shared by every source
+    store: TimeSeriesStore = TimeSeriesStore()
+    # expiry rules of the stored series (ttl, market close) and cache directory
+    cache: CachePolicy = CachePolicy()
+    # pooled HTTP client used for every API call
+    transport: HTTPTransport = defaultTransport
+    # global events annotated on the charts, read on first use
+    eventIndex: Union[EventIndex, None] = None
+    # indicators of the current history by (indicator, params), per instance
+    indicatorCache: Union[Dict[Tuple, pd.DataFrame], None] = None
+
+    # background loads started by prefetch, by name
+    prefetched: Dict[str, Future] = {}
+    prefetchKeyName: str = "OPENTERMINAL_PREFETCH"
+    # worker threads shared by every source, created on first prefetch
+    prefetchExecutor: Union[ThreadPoolExecutor, None] = None
+
+    def loadDaily(
+        self,
+        startDate: DateLike = None,
+        endDate: DateLike = None,
+    ) -> pd.DataFrame:
+        """
+        Function returns the daily OHLC data
+        :param startDate: date, or window such as "1y", "6m", "ytd", "max". Defaults to "1y"
+        :param endDate: defaults to the last trading day
+        :return:
+        """
+        assert self.isValidElement, Exception("Select valid symbol")
+
+        # the full history is kept in self.df, the window is a slice of it
+        return self.dailyWindow(startDate, endDate)
 
     @abstractmethod
-    def loadDaily(self) -> pd.DataFrame:
+    def dailyURL(self, outputSize: Literal["full", "compact"]) -> str:
+        """
+        Returns the URL of the daily time series of the element
+        :param outputSize: "full" for the whole history, "compact" for the last 100 bars
+        :return:
+        """
         pass
 
+    @abstractmethod
+    def parseDaily(self, data: Dict) -> pd.DataFrame:
+        """
+        Parses the daily time series payload into a frame sorted by date
+        :param data:
+        :return:
+        """
+        pass
+
+    def parseDailyCSV(self, body: BinaryIO) -> pd.DataFrame:
+        return parseTimeSeriesCSV(body, self.dailyColumns)
+
+    def fetchDaily(self, outputSize: Literal["full", "compact"] = "full") -> pd.DataFrame:
+        """
+        Downloads the daily OHLC history of the element
+        :param outputSize: "full" for the whole history, "compact" for the last 100 bars
+        :return:
+        """
+        url = self.dailyURL(outputSize)
+        logger.debug(f"URL for daily time series is : {url}")
+        if self.dataType == "csv":
+            result = self.transport.getCSV(url, self.parseDailyCSV)
+            # errors come back as JSON payloads
+            return result if isinstance(result, pd.DataFrame) else self.parseDaily(result)
+        return self.parseDaily(self.transport.getJSON(url))
+
+    async def afetchDaily(
+        self, outputSize: Literal["full", "compact"] = "full"
+    ) -> pd.DataFrame:
+        url = self.dailyURL(outputSize)
+        logger.debug(f"URL for daily time series is : {url}")
+        if self.dataType == "csv":
+            result = await self.transport.agetCSV(url, self.parseDailyCSV)
+            return result if isinstance(result, pd.DataFrame) else self.parseDaily(result)
+        return self.parseDaily(await self.transport.agetJSON(url))
+
+    async def aloadDaily(
+        self,
+        startDate: DateLike = None,
+        endDate: DateLike = None,
+    ) -> pd.DataFrame:
+        """
+        Async counterpart of loadDaily
+        :param startDate: date, or window such as "1y", "6m", "ytd", "max". Defaults to "1y"
+        :param endDate: defaults to the last trading day
+        :return:
+        """
+        assert self.isValidElement, Exception("Select valid symbol")
+
+        if self.dailyHistoryExpired():
+            self.setDailyHistory(*await self.aloadCachedDaily(self.afetchDaily))
+        return self.sliceWindow(self.df, *resolveWindow(startDate, endDate))
+
+    def cachedDaily(self) -> Tuple[Union[pd.DataFrame, None], Union[pd.DataFrame, None]]:
+        """
+        Looks the daily history up in the store
+        :return: (fresh stored frame or None, expired stored frame to refresh or None)
+        """
+        path = self.store.path(self.assetClass, self.sourceName, self.element)
+        if not path.exists():
+            return None, None
+
+        storedDF = self.store.read(
+            self.assetClass, self.sourceName, self.element, columns=self.dailyColumns
+        )
+        if not self.cache.isExpired(path):
+            logger.debug(f"Store hit : {path}")
+            return storedDF, None
+        if storedDF.empty:
+            return None, None
+        return None, storedDF
+
+    def isCompactRefresh(self, storedDF: pd.DataFrame) -> bool:
+        # business days missing since the last stored bar
+        gap = np.busday_count(storedDF.index.max().date(), datetime.date.today())
+        return gap < self.compactWindowSize
+
+    def storeDaily(self, df: pd.DataFrame) -> None:
+        if not df.empty:
+            self.store.write(self.assetClass, self.sourceName, self.element, df)
+
+    def loadCachedDaily(
+        self, fetchFunction: Callable[[str], pd.DataFrame]
+    ) -> Tuple[pd.DataFrame, bool]:
+        """
+        Returns the full daily history for the element from the store. If it has
+        expired it is refreshed incrementally with the "compact" window, if it is
+        missing (or too old) the "full" history is downloaded. If the download fails
+        or returns no bars, the last stored history is returned.
+        :param fetchFunction: downloads and parses the history for the given output size
+        :return: (history, False if it couldn't be refreshed)
+        """
+        df, storedDF = self.cachedDaily()
+        if df is not None:
+            return df, True
+
+        try:
+            if storedDF is not None and self.isCompactRefresh(storedDF):
+                df = self.mergeDaily(storedDF, fetchFunction("compact"))
+            if df is None:
+                df = fetchFunction("full")
+        except Exception as error:
+            if storedDF is None:
+                raise
+            return self.staleDaily(storedDF, error)
+
+        if df.empty:
+            return self.staleDaily(storedDF, "no bars returned")
+        self.storeDaily(df)
+        return df, True
+
+    async def aloadCachedDaily(
+        self, fetchFunction: Callable[[str], Awaitable[pd.DataFrame]]
+    ) -> Tuple[pd.DataFrame, bool]:
+        # the store is read and written on a worker thread, off the event loop
+        df, storedDF = await asyncio.to_thread(self.cachedDaily)
+        if df is not None:
+            return df, True
+
+        try:
+            if storedDF is not None and self.isCompactRefresh(storedDF):
+                df = self.mergeDaily(storedDF, await fetchFunction("compact"))
+            if df is None:
+                df = await fetchFunction("full")
+        except Exception as error:
+            if storedDF is None:
+                raise
+            return self.staleDaily(storedDF, error)
+
+        if df.empty:
+            return self.staleDaily(storedDF, "no bars returned")
+        await asyncio.to_thread(self.storeDaily, df)
+        return df, True
+
+    def staleDaily(
+        self, storedDF: Union[pd.DataFrame, None], error: Any
+    ) -> Tuple[pd.DataFrame, bool]:
+        """
+        History used when a refresh failed : the last stored one, or no bars
+        :param storedDF: expired stored history, None if nothing is stored
+        :param error: why the refresh failed
+        :return: (history, False)
+        """
+        if storedDF is None:
+            return emptyFrame(self.dailyColumns), False
+        logger.warning(
+            f"Could not refresh the daily history of {self.element}, using the stored one. Error is : {error}"
+        )
+        return storedDF, False
+
+    def loadDailyHistory(self) -> Tuple[pd.DataFrame, bool]:
+        """
+        Returns the full daily history, from the prefetch if one was started
+        :return: (history, False if it couldn't be refreshed)
+        """
+        return self.prefetchedResult(
+            "daily", lambda: self.loadCachedDaily(self.fetchDaily)
+        )
+
+    def dailyHistoryExpired(self) -> bool:
+        return self.df is None or datetime.datetime.now(datetime.timezone.utc) >= self.dfExpiresAt
+
+    def setDailyHistory(self, df: pd.DataFrame, refreshed: bool = True) -> None:
+        """
+        Keeps the full daily history in memory
+        :param df:
+        :param refreshed: False if the refresh failed and df is the stored history (or
+        no bars) : it is only kept for refreshRetryInterval, not until the market close
+        :return:
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self.df = df
+        self.dfExpiresAt = self.cache.expiresAt(now) if refreshed else now + self.refreshRetryInterval
+        # indicators of the previous history are dropped with it
+        self.indicatorCache = {}
+
+    def dailyWindow(self, startDate: DateLike, endDate: DateLike) -> pd.DataFrame:
+        """
+        Returns the daily bars between startDate and endDate. The full history is
+        loaded once into self.df, so other windows of the same element are answered
+        from memory.
+        :param startDate: date or window spec, resolved with windows.resolveWindow
+        :param endDate:
+        :return:
+        """
+        startDate, endDate = resolveWindow(startDate, endDate)
+        return self.sliceWindow(self.dailyHistory(), startDate, endDate)
+
+    def dailyHistory(self) -> pd.DataFrame:
+        """
+        Returns the full daily history, loaded again once expired
+        :return:
+        """
+        if self.dailyHistoryExpired():
+            self.setDailyHistory(*self.loadDailyHistory())
+        return self.df
+
+    def indicator(
+        self,
+        name: str,
+        *params: float,
+        startDate: DateLike = None,
+        endDate: DateLike = None,
+    ) -> pd.DataFrame:
+        """
+        Returns a technical indicator of the loaded element between startDate and
+        endDate. It is computed over the full history, so the first values of the
+        window don't lack data, and cached until the history is reloaded.
+        e.g. indicator("sma", 50, startDate="5y")
+        :param name: key of indicators.indicatorFunctions, e.g. "sma", "rsi", "macd"
+        :param params: parameters of the indicator, defaults of the indicator otherwise
+        :param startDate: date or window spec, resolved with windows.resolveWindow
+        :param endDate:
+        :return: frame with one column per line of the indicator
+        """
+        startDate, endDate = resolveWindow(startDate, endDate)
+        history = self.dailyHistory()
+
+        key = (name, params)
+        if key not in self.indicatorCache:
+            self.indicatorCache[key] = computeIndicator(history, name, *params)
+        return self.sliceWindow(self.indicatorCache[key], startDate, endDate)
+
+    @staticmethod
+    def sliceWindow(
+        df: pd.DataFrame, startDate: Union[datetime.date, None], endDate: datetime.date
+    ) -> pd.DataFrame:
+        """
+        Returns the rows of df between startDate and endDate (inclusive), found with
+        a binary search of its sorted index
+        :param df: frame with a sorted datetime64 index
+        :param startDate: None for the start of the history
+        :param endDate:
+        :return: no rows if startDate is after endDate
+        """
+        start = 0 if startDate is None else df.index.searchsorted(pd.Timestamp(startDate), side="left")
+        end = df.index.searchsorted(pd.Timestamp(endDate), side="right")
+        return df.iloc[start:end]
+
+    def prefetchFunctions(self) -> Dict[str, Callable[[], Any]]:
+        """
+        Loads run in the background by prefetch, by name. Only the daily series,
+        which every chart needs : other data (e.g. fundamentals) is downloaded when a
+        command first asks for it, so a load doesn't spend API quota for nothing.
+        :return:
+        """
+        return {"daily": lambda: self.loadCachedDaily(self.fetchDaily)}
+
+    def prefetch(self) -> None:
+        """
+        Starts the loads of prefetchFunctions on worker threads, so the data is warm
+        when a command needs it (disable with OPENTERMINAL_PREFETCH=0)
+        :return:
+        """
+        if os.environ.get(self.prefetchKeyName, "1") == "0":
+            return
+        if DataSourceBase.prefetchExecutor is None:
+            DataSourceBase.prefetchExecutor = ThreadPoolExecutor(
+                max_workers=4, thread_name_prefix="prefetch"
+            )
+
+        self.prefetched = {}
+        for name, function in self.prefetchFunctions().items():
+            logger.debug(f"Prefetching {name} data for : {self.element}")
+            self.prefetched[name] = DataSourceBase.prefetchExecutor.submit(function)
+
+    def prefetchedResult(self, name: str, function: Callable[[], Any]) -> Any:
+        """
+        Returns the result of the prefetch of name, waiting for it if it is still
+        running. Calls function instead if nothing was prefetched or the prefetch
+        failed. A prefetched result is only used once.
+        :param name: key of prefetchFunctions
+        :param function: loads the data without the prefetch
+        :return:
+        """
+        future = self.prefetched.pop(name, None)
+        if future is not None:
+            error = future.exception()
+            if error is None:
+                return future.result()
+            logger.warning(f"Prefetch of {name} data failed, loading again. Error is : {error}")
+        return function()
+
+    @staticmethod
+    def mergeDaily(
+        storedDF: pd.DataFrame, compactDF: pd.DataFrame
+    ) -> Union[pd.DataFrame, None]:
+        """
+        Merges a freshly downloaded compact window into the stored history,
+        keeping the fresh row for duplicated dates. Returns None if the compact
+        window doesn't overlap the stored history, i.e. a full download is needed.
+        :param storedDF:
+        :param compactDF:
+        :return:
+        """
+        if compactDF.empty or compactDF.index.min() > storedDF.index.max():
+            return None
+        logger.debug(f"Merging {compactDF.shape[0]} compact rows into the stored history")
+
+        df = pd.concat([storedDF, compactDF])
+        df = df[~df.index.duplicated(keep="last")]
+        df.sort_index(inplace=True)
+        return df
+
+    @classmethod
+    def readStored(
+        cls,
+        symbols: Union[List[str], None] = None,
+        startDate: DateLike = "max",
+        endDate: DateLike = None,
+        columns: Union[List[str], None] = None,
+    ) -> pd.DataFrame:
+        """
+        Reads the stored daily bars of many elements of the source without any
+        request, e.g. for research
+        :param symbols: elements to read, every stored one by default
+        :param startDate: date or window spec, defaults to the whole history
+        :param endDate:
+        :param columns: subset of the store columns
+        :return: frame with a Symbol and a Date column
+        """
+        startDate, endDate = resolveWindow(startDate, endDate)
+        return cls.store.readMany(
+            cls.assetClass, cls.sourceName, symbols, startDate, endDate, columns
+        )
+
+    @classmethod
+    def loadDailyMany(
+        cls,
+        symbols: List[Union[str, Tuple[str, ...]]],
+        maxWorkers: int = 8,
+        longFormat: bool = False,
+        **loadDailyKwargs,
+    ) -> Union[Dict[str, pd.DataFrame], pd.DataFrame]:
+        """
+        Loads the daily data of many symbols concurrently. Requests still go through
+        the source transport, so they are scheduled within the API rate limit.
+        :param symbols: constructor arguments of each element, e.g. "IBM" or ("EUR", "USD")
+        :param maxWorkers: number of concurrent fetches
+        :param longFormat: return one frame with a Symbol and a Date column instead of a dict
+        :param loadDailyKwargs: forwarded to loadDaily (startDate, endDate)
+        :return: dict of element -> frame, in the order of symbols, or a long format frame
+        """
+
+        def load(symbol: Union[str, Tuple[str, ...]]) -> Tuple[str, pd.DataFrame]:
+            instance = cls(*symbol) if isinstance(symbol, tuple) else cls(symbol)
+            return instance.element, instance.loadDaily(**loadDailyKwargs)
+
+        results: Dict[Union[str, Tuple[str, ...]], Tuple[str, pd.DataFrame]] = {}
+        with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+            futures = {executor.submit(load, symbol): symbol for symbol in symbols}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as error:
+                    logger.error(f"Error loading daily data for : {futures[future]}. Error is : {error}")
+
+        frames: Dict[str, pd.DataFrame] = dict(
+            results[symbol] for symbol in symbols if symbol in results
+        )
+        if not longFormat:
+            return frames
+        if not frames:
+            return pd.DataFrame(columns=["Symbol", "Date"])
+        return pd.concat(frames, names=["Symbol", "Date"]).reset_index()
+
     @abstractmethod
     def find(cls) -> pd.DataFrame:
         pass
 
+    @classmethod
+    async def afind(cls, *args) -> pd.DataFrame:
+        # sources searching a local list don't need to await anything
+        return cls.find(*args)
+
     @abstractmethod
     def checkSymbolExists(self, element: str) -> bool:
         pass
 
-    def plotLine(cls, df: pd.DataFrame, plotGlobalEvents: bool = True, adjust=True):
+    async def acheckSymbolExists(self, element: str) -> bool:
+        # the check may read a listing, off the event loop
+        return await asyncio.to_thread(self.checkSymbolExists, element)
+
+    @classmethod
+    async def acreate(cls, *args, **kwargs) -> "DataSourceBase":
+        """
+        Async counterpart of the constructor : the element is validated (listing read
+        or download, GLOBAL_QUOTE request) on a worker thread, off the event loop
+        e.g. source = await AlphaVantageStockDataSource.acreate("IBM")
+        :param args: constructor arguments, e.g. "IBM" or ("EUR", "USD")
+        :param kwargs:
+        :return:
+        """
+        return await asyncio.to_thread(cls, *args, **kwargs)
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Drops the in-memory state of the source (listings, open connections) so it is
+        rebuilt from the current environment on next use. The on-disk cache is kept.
+        :return:
+        """
+        # closes the connections and reads the transport settings again
+        cls.transport.reset()
+
+    @classmethod
+    def getEventIndex(cls) -> EventIndex:
+        if DataSourceBase.eventIndex is None:
+            DataSourceBase.eventIndex = EventIndex.fromFile()
+        return DataSourceBase.eventIndex
+
+    def plotOverlays(
+        cls, fig, ax, overlays: Union[List[Tuple[str, pd.DataFrame]], None] = None
+    ) -> None:
+        """
+        Draws indicators over the price line of plotLine. Price scale indicators
+        (moving averages, bands) share the price axis, the others (RSI, MACD, ...)
+        get a secondary axis, created once and hidden while unused. Lines of the
+        previous plot no longer drawn are removed.
+        :param fig:
+        :param ax: price axis
+        :param overlays: [(indicator name, indicator frame), ...]
+        :return:
+        """
+        otherAx = next((other for other in fig.axes if other is not ax), None)
+        keep, keepOther = {"Close"}, set()
+        for name, frame in overlays or []:
+            if isPriceScale(name):
+                targetAx, lineStyle = ax, "-"
+                keep.update(frame.columns)
+            else:
+                otherAx = otherAx or ax.twinx()
+                targetAx, lineStyle = otherAx, "--"
+                keepOther.update(frame.columns)
+            for column in frame.columns:
+                plotted = minMaxDownsample(frame, column, pixelWidth(ax))
+                plots.updateLine(
+                    targetAx,
+                    column,
+                    plotted.index,
+                    plotted[column].to_numpy(),
+                    linewidth=1,
+                    linestyle=lineStyle,
+                )
+        plots.removeLines(ax, keep)
+
+        # the price axis is drawn above the secondary one, with the legend of both
+        ax.patch.set_visible(not keepOther)
+        if otherAx is not None:
+            plots.removeLines(otherAx, keepOther)
+            # an empty secondary axis no longer widens the shared dates axis
+            otherAx.relim()
+            otherAx.autoscale_view()
+            otherAx.set_visible(bool(keepOther))
+            otherAx.set_zorder(ax.get_zorder() - 1)
+            otherAx.yaxis.tick_left()
+            otherAx.yaxis.set_label_position("left")
+
+        # limits fitted once the lines of the previous plot are gone
+        ax.relim()
+        ax.autoscale_view()
+
+    def plotLine(
+        cls,
+        df: pd.DataFrame,
+        plotGlobalEvents: bool = True,
+        adjust=True,
+        overlays: Union[List[Tuple[str, pd.DataFrame]], None] = None,
+    ):
+        # matplotlib is imported by the first chart, not with the data sources
+        import matplotlib.dates as mdates
+
         # Check if df is not empty
         assert not (df.empty), Exception("No data available for plotting")
         assert "Close" in df.columns, Exception("'Close' column not found in df")
 
-        fig, ax = plt.subplots()
-        df.plot(ax=ax, kind="line", y="Close", color="#003366")
+        # the price line of the previous plot is updated in place
+        fig, ax = plots.axes("plotLine")
+        plots.clearAnnotations(ax)
+        # draw at most two points per pixel, keeping the peaks and troughs
+        plotted = minMaxDownsample(df, "Close", pixelWidth(ax))
+        plots.updateLine(ax, "Close", plotted.index, plotted["Close"].to_numpy(), color="#003366")
+        cls.plotOverlays(fig, ax, overlays)
         # Plot the global events
         if plotGlobalEvents:
             fig, ax = cls.plotGlobalEvents(df, fig, ax)
@@ -73,93 +604,93 @@ class DataSourceBase(ABC):
         ax.xaxis.set_major_formatter(formatter)
         ax.xaxis.grid(True, which="minor")
 
-        plt.legend()
-        ax.grid()
+        ax.legend(handles=plots.legendHandles(fig))
+        ax.grid(True)
         # plt.tight_layout()
 
         return fig, ax
 
-    def plotCandle(cls, df: pd.DataFrame, volume=True):
+    def plotCandle(
+        cls,
+        df: pd.DataFrame,
+        volume=True,
+        overlays: Union[List[Tuple[str, pd.DataFrame]], None] = None,
+    ):
+        # mplfinance imports pyplot, only when candles are drawn
+        import mplfinance as mpl
+
         # Check if df is not empty
         assert not (df.empty), Exception("No data available for plotting")
+        missingColumns = {"Open", "High", "Low", "Close"} - set(df.columns)
+        assert not missingColumns, Exception(f"{sorted(missingColumns)} columns not found in df")
+        # only indicators on the price scale are drawn over the candles
+        for name, frame in overlays or []:
+            assert isPriceScale(name), Exception(
+                f"{name} can't be drawn over candles, use --type line"
+            )
 
-        df.index = pd.to_datetime(df.index)
+        df = df.set_index(pd.to_datetime(df.index))
+        # no volume panel for series without volume, e.g. forex
+        volume = volume and "Volume" in df.columns and bool(df["Volume"].notna().any())
 
-        fig, ax = plt.subplots()
-        mpl.plot(df, type="candle", style="sas", ax=ax)
+        # the figure is reused, its axes are recreated for the volume panel
+        fig = plots.figure("plotCandle")
+        fig.clear()
+        if volume:
+            ax, volumeAx = fig.subplots(
+                nrows=2, sharex=True, gridspec_kw={"height_ratios": [3, 1]}
+            )
+        else:
+            ax, volumeAx = fig.subplots(), False
+
+        # long windows are drawn with weekly, monthly ... candles
+        rule, period = candleRule(df, int(pixelWidth(ax) / candlePixels))
+        candles = resampleOHLC(df, rule)
+
+        # overlays take the value of the last day of each candle
+        addPlots = []
+        for name, frame in overlays or []:
+            if rule is not None:
+                frame = frame.resample(rule).last()
+            frame = frame.reindex(candles.index)
+            addPlots += [
+                mpl.make_addplot(frame[column], ax=ax, width=1, label=column)
+                for column in frame.columns
+                if frame[column].notna().any()
+            ]
+        mpl.plot(
+            candles, type="candle", style="sas", ax=ax, volume=volumeAx, addplot=addPlots
+        )
+        if addPlots:
+            ax.legend(loc="upper left")
 
         ax.set_title(
             f"\nTICKER : {cls.element}"
-            f"\n{df.index[0]} to {df.index[-1]}"
+            f"\n{df.index[0]} to {df.index[-1]} ({period} candles)"
             f"\nMin: {df['Close'].min()}, Max: {df['Close'].max()}, Last: {df['Close'].tolist()[-1]}",
             loc="left",
             fontsize="medium",
         )
-        ax.grid()
+        ax.grid(True)
 
-        plt.tight_layout()
+        fig.tight_layout()
 
         return fig, ax
 
     def plotGlobalEvents(self, df, fig, ax, adjust=True):
-
-        globalEvents = [
-            {"eventName": "Ukraine war", "eventDate": "2022-02-24"},
-            {"eventName": "US sanctions", "eventDate": "2022-03-15"},
-            {"eventName": "Russian gas in Rubles", "eventDate": "2022-03-22"},
-            {"eventName": "India ban wheat export", "eventDate": "2022-05-14"},
-            {"eventName": "Covid started", "eventDate": "2019-12-31"},
-            {"eventName": "Coinbase IPO", "eventDate": "2021-04-14"},
-            {"eventName": "USDC Feb GT report", "eventDate": "2021-04-27"},
-            {"eventName": "Coinbase convertible bond", "eventDate": "2021-05-17"},
-            {"eventName": "Crypto Crash", "eventDate": "2021-05-19"},
-            {"eventName": "UST Terra crash", "eventDate": "2022-05-13"},
-            {"eventName": "NFLX price inc", "eventDate": "2022-04-19"},
-            {"eventName": "Russia stop gas to Finland", "eventDate": "2022-05-20"},
-        ]
-        globalEventsDF = pd.DataFrame(globalEvents)
-        globalEventsDF.eventDate = pd.to_datetime(globalEventsDF.eventDate)
-        globalEventsDF.set_index("eventDate", inplace=True)
-        globalEventsDF.sort_index(inplace=True)
-
-        mergedEventsDF = pd.merge(
-            left=globalEventsDF,
-            right=df,
-            left_index=True,
-            right_index=True,
-            how="outer",
-        )
-        mergedEventsDF = mergedEventsDF[
-            (mergedEventsDF.index >= df.index.min())
-            & (mergedEventsDF.index <= df.index.max())
-        ]
-        if mergedEventsDF.empty:
+        dates, names, prices = self.getEventIndex().locate(df.index, df["Close"].to_numpy())
+        if len(dates) == 0:
             return fig, ax
-        mergedEventsDF.interpolate(
-            method="linear", inplace=True, limit_direction="both"
-        )
-        # Filter rows where we have events
-        mergedEventsDF = mergedEventsDF[mergedEventsDF.eventName.notnull()]
-
-        if mergedEventsDF.shape[0] == 1:
-            ax.scatter(
-                x=mergedEventsDF.index.tolist(),
-                y=mergedEventsDF.Close.tolist(),
-                marker="o",
-                color="r",
-            )
-        else:
-            ax.scatter(
-                x=mergedEventsDF.index,
-                y=mergedEventsDF.Close.tolist(),
-                marker="o",
-                color="r",
-            )
 
-        texts = []
-        for index, row in mergedEventsDF.iterrows():
-            texts.append(ax.text(index, row["Close"], row["eventName"], fontsize=12))
+        ax.scatter(x=pd.DatetimeIndex(dates), y=prices, marker="o", color="r")
+
+        texts = [
+            ax.text(date, price, name, fontsize=12)
+            for date, price, name in zip(pd.DatetimeIndex(dates), prices, names)
+        ]
         if False:
+            from adjustText import adjust_text
+
             adjust_text(
                 texts,
                 arrowprops=dict(arrowstyle="->", color="blue"),
@@ -173,205 +704,16 @@ class DataSourceBase(ABC):
         return fig, ax
 
 
-class TerminalLoop:
-    commands: List[str] = [
-        "forex",
-        "fo" "reset",
-        "r" "quit",
-        "q",
-        "help",
-        "h",
-    ]
-
-    def runLoop(self):
-
-        # Print help message
-        helpMessage = (
-            "[red]Welcome to stock bot. Choose from the following choices."
-            f"\n Choose from the following : [yellow]{self.commands}"
-        )
-        console.print(helpMessage)
+def resetSources(baseClass: type = DataSourceBase) -> None:
+    """
+    Resets every imported data source, e.g. after .env was reloaded
+    :param baseClass:
+    :return:
+    """
+    DataSourceBase.cache = CachePolicy()
+    DataSourceBase.store = TimeSeriesStore()
+    DataSourceBase.eventIndex = None
+    for sourceClass in baseClass.__subclasses__():
+        sourceClass.reset()
+        resetSources(sourceClass)
 
-        # Parser for parsing the command
-        forexParser = argparse.ArgumentParser(prog="forex", add_help=True)
-        forexParser.add_argument("cmd", choices=self.commands)
-
-        continueTerminalLoop: bool = True
-        while continueTerminalLoop:
-            userInput = session.prompt("Forex>> ")
-
-            # Parse main command of the list of possible self.commands
-            try:
-                (forexParserArgs, l_args) = forexParser.parse_known_args(
-                    userInput.lower().split()
-                )
-            except SystemExit:
-                console.print(
-                    f"[red]The command selected doesn't exist. Available commands are : {self.commands}"
-                )
-                continue
-
-            ################
-            # Quit program #
-            ################
-            if forexParserArgs.cmd in ("help", "h"):
-                console.print(helpMessage)
-
-            ################
-            # Quit program #
-            ################
-            elif forexParserArgs.cmd in ("quit", "q"):
-                console.print("[red]Exiting Forex section")
-                continueTerminalLoop = False
-
-            ################
-            # Clear screen #
-            ################
-            elif forexParserArgs.cmd == "cls":
-                os.system("cls||clear")
-
-            ################
-            # Load program #
-            ################
-            elif forexParserArgs.cmd in ("load"):
-                ##########################
-                # Create load parameters #
-                ##########################
-                loadParser = argparse.ArgumentParser(prog="load")
-                loadParser.add_argument("--fromCurrency", type=str, required=True)
-                loadParser.add_argument("--toCurrency", type=str, required=True)
-                loadParser.add_argument(
-                    "--source",
-                    choices=[list(self.sourceClassMapping.keys())],
-                    default="av",
-                )
-
-                try:
-                    (loadParserArgs, largs) = loadParser.parse_known_args(
-                        userInput.split()
-                    )
-                except SystemExit:
-                    console.print("[red]Invalid arguments")
-                    continue
-
-                ###########################
-                # Load data for the stock #
-                ###########################
-
-                try:
-                    # Check if the source they have chosen is correct
-                    assert (
-                        loadParserArgs.source in self.sourceClassMapping.keys()
-                    ), Exception(
-                        f"Source {loadParserArgs.source} not defined. Valid values are: {list(self.sourceClassMapping.keys())}"
-                    )
-
-                    # Check if we have the correct class
-                    self.classToUse = self.sourceClassMapping[loadParserArgs.source]
-                    self.classInstance = self.sourceClassMapping[loadParserArgs.source](
-                        fromCurrency=loadParserArgs.fromCurrency,
-                        toCurrency=loadParserArgs.toCurrency,
-                    )
-                except Exception as error:
-                    console.print(f"[red]{error}")
-
-            ################
-            # Plot Program #
-            ################
-            elif forexParserArgs.cmd in ("plotLine", "pl"):
-                if self.classInstance is not None:
-                    ##############################
-                    # Create plotLine parameters #
-                    ##############################
-                    viewParser = argparse.ArgumentParser(prog="plotLine")
-                    viewParser.add_argument(
-                        "--type",
-                        type=str,
-                        required=False,
-                        default="line",
-                        choices=["line", "ohlc"],
-                    )
-                    viewParser.add_argument(
-                        "--startDate",
-                        type=lambda d: datetime.datetime.strptime(d, "%Y-%m-%d"),
-                        help="The starting date (format YYYY-MM-DD)",
-                        default=datetime.datetime.today()
-                        - datetime.timedelta(days=365),
-                    )
-                    viewParser.add_argument(
-                        "--endDate",
-                        type=lambda d: datetime.datetime.strptime(d, "%Y-%m-%d"),
-                        help="The ending date (format YYYY-MM-DD)",
-                        default=datetime.datetime.today(),
-                    )
-                    viewParser.add_argument(
-                        "--adjust",
-                        type=int,
-                        help="",
-                        default=1,
-                    )
-                    try:
-                        (viewParserArgs, largs) = viewParser.parse_known_args(
-                            userInput.split()
-                        )
-                    except SystemExit:
-                        console.print("[red]Invalid arguemnts")
-                        continue
-
-                    ###########################
-                    # Load data for the stock #
-                    ###########################
-                    try:
-                        df = self.classInstance.loadDaily(
-                            startDate=ciso8601.parse_datetime(
-                                str(viewParserArgs.startDate)
-                            ),
-                            endDate=ciso8601.parse_datetime(
-                                str(viewParserArgs.endDate)
-                            ),
-                        )
-                        self.classInstance.plotLine(
-                            df, plotGlobalEvents=True, adjust=viewParserArgs.adjust
-                        )
-                        plt.show()
-                    except Exception as err:
-                        console.print(f"[red]{err}")
-                else:
-                    console.print("[red]currency not loaded. Use load command")
-            ################
-            # Find program #
-            ################
-            elif forexParserArgs.cmd in ("find", "fi"):
-                #########################
-                # Create cmd parameters #
-                #########################
-                findParser = argparse.ArgumentParser(prog="find")
-                findParser.add_argument("--keyword", type=str, required=True)
-
-                try:
-                    (findParserArgs, largs) = findParser.parse_known_args(
-                        userInput.split()
-                    )
-                except SystemExit:
-                    console.print("[red]Invalid arguemnts")
-                    continue
-
-                ###########################
-                # Load data for the stock #
-                ###########################
-                console.print(f"Results for : {findParserArgs.keyword}")
-                searchResultsDF: pd.DataFrame = self.classToUse.find(
-                    findParserArgs.keyword
-                )
-                # searchResultsDF: pd.DataFrame = AlphaVantageForexSource.find(
-                #     findParserArgs.keyword
-                # )
-                # searchResultsDF: pd.DataFrame = searchStock(findParserArgs.keyword)
-                rich_dataframe.prettify(searchResultsDF)
-
-            else:
-                console.print("Here")
-                console.print(
-                    f"[red]The command selected doesn't exist. Available commands are : {self.commands}"
-                )
-                continue
@@ -1,28 +1,46 @@
 import argparse
-import datetime
+import asyncio
 import os
-from typing import Union, Dict, Literal, List
+from typing import Dict, List, Literal, Tuple, Union
 
-import ciso8601
 import pandas as pd
-import requests
-import rich_dataframe
 from loguru import logger
-from matplotlib import pyplot as plt
-from matplotlib.ticker import FuncFormatter
 
+from parsers import emptyFrame, parseTimeSeries
+from rateLimiter import AlphaVantageScheduler, alphaVantageTransport
 from sources import DataSourceBase
-from common import console, session
-from prompt_toolkit.completion import WordCompleter
+from symbolUniverse import SymbolUniverse
+from commands import SourceSectionLoop, argument, command
+from common import plots, showFigure
+
+
+def createUniverse() -> SymbolUniverse:
+    """
+    Returns the Alpha Vantage symbol listing, in the current cache directory
+    :return:
+    """
+    return SymbolUniverse(
+        DataSourceBase.cache.cacheDir / "alphavantage" / "LISTING_STATUS.csv",
+        transport=alphaVantageTransport,
+    )
 
 
 class AlphaVantageStockDataSource(DataSourceBase):
+    assetClass: str = "stock"
     apiURL: str = "https://www.alphavantage.co/query?"
     apiKeyName: str = "ALPHA_VANTAGE_API_KEY"
     apiKey: str = None
+    sourceName: str = "alphavantage"
+    dataType: Literal["json", "csv"] = os.environ.get(DataSourceBase.dataTypeKeyName, "json")
+    dailyFunctionName: str = "TIME_SERIES_DAILY"
+    transport: AlphaVantageScheduler = alphaVantageTransport
+    # local listing of every active symbol, used to validate symbols offline
+    universe: SymbolUniverse = createUniverse()
     outputSize: Literal["full", "compact"] = "full"
     isValidElement: bool = False
     element: Union[str, None] = None
+    # (quarterly, annual) balance sheets, downloaded by the first getFundamentalData
+    fundamentalData: Union[Tuple[pd.DataFrame, pd.DataFrame], None] = None
 
     def __init__(self, stockName: str):
         # check if API key is present in environment variable or not
@@ -34,114 +52,109 @@ class AlphaVantageStockDataSource(DataSourceBase):
             self.apiKeyName, "demo"
         )  # get api key name from environment
 
-        # # Check if given valid stock name
+        # # Check if given valid stock name against the local symbol listing
         assert self.checkSymbolExists(stockName), Exception(
-            f'Invalid stock name provided. Close matches are : {self.find(stockName)["Symbol"].tolist()}'
+            f"Invalid stock name provided. Close matches are : {self.closeMatches(stockName)}"
         )
         self.element = stockName.upper()
 
         self.isValidElement = True
 
-    def loadDaily(
-        self,
-        startDate: datetime.date = datetime.datetime.today()
-        - datetime.timedelta(days=366),
-        endDate: datetime.date = datetime.datetime.today(),
-    ) -> pd.DataFrame:
-        """
-        Function returns the daily OHLC data
-        :param startDate:
-        :param endDate:
-        :return:
-        """
-        assert self.isValidElement, Exception("Select valid symbol")
-        assert startDate < endDate, Exception("Start date should be less than end date")
-
+    def dailyURL(self, outputSize: Literal["full", "compact"]) -> str:
         # function name and symbol name
-        functionName: str = "TIME_SERIES_DAILY"
+        functionName: str = self.dailyFunctionName
         symbol: str = self.element
 
-        url = f"{self.apiURL}function={functionName}&symbol={symbol}&outputsize={self.outputSize}&apikey={self.apiKey}&datatype=json"
-        logger.debug(f"URL for daily time series is : {url}")
-        r = requests.get(url)
-        data: Dict = r.json()
+        return f"{self.apiURL}function={functionName}&symbol={symbol}&outputsize={outputSize}&apikey={self.apiKey}&datatype={self.dataType}"
 
-        if "Error Message" in data:
-            logger.exception(
-                f"Error getting daily stock prices for : {self.element} from ALPHA_VANTAGE. Error is : {data['Error Message']}"
+    def parseDaily(self, data: Dict) -> pd.DataFrame:
+        if "Time Series (Daily)" not in data:
+            logger.error(
+                f"Error getting daily prices for : {self.element} from ALPHA_VANTAGE. Error is : {data.get('Error Message', data)}"
             )
-            return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+            return emptyFrame(self.dailyColumns)
         else:
-            # load data in dictionary
-            df = pd.DataFrame.from_dict(data["Time Series (Daily)"], orient="index")
-            # rename columns and sort data
-            df.columns = ["Open", "High", "Low", "Close", "Volume"]
-            for column in df.columns:
-                df[column] = df[column].astype(float)
-            df.sort_index(inplace=True)
-
-            # convert index to datetime
-            df.index = pd.to_datetime(df.index)
-            logger.critical(f"Min and max : {df.index.min()} and {df.index.max()}")
-            # filter data
-            df = df[(df.index >= str(startDate)) & (df.index <= str(endDate))]
-            # Convert to datetime
-            logger.critical(f"Min and max : {df.index.min()} and {df.index.max()}")
-
-            self.df = df
+            # parse straight into float64 columns and a datetime64 index
+            df = parseTimeSeries(data["Time Series (Daily)"], self.dailyColumns)
             return df
 
-    def checkSymbolExists(self, symbolName: str) -> bool:
-        # To check if symbol exists, then it
-        functionName: str = "GLOBAL_QUOTE"
-        symbol: str = symbolName
+    def isListed(self, symbolName: str) -> bool:
+        """
+        True if the symbol is in the local listing. The listing only covers US
+        exchanges, so False doesn't mean the symbol doesn't exist (e.g. TSCO.LON)
+        :param symbolName:
+        :return:
+        """
+        try:
+            return self.universe.contains(symbolName)
+        except Exception as error:
+            logger.warning(f"Symbol listing unavailable : {error}")
+            return False
 
-        url = (
-            f"{self.apiURL}function={functionName}&symbol={symbol}&apikey={self.apiKey}"
-        )
+    def closeMatches(self, symbolName: str, limit: int = 5) -> List[str]:
+        """
+        Symbols of the local listing closest to symbolName, ranked as by find
+        :param symbolName:
+        :param limit:
+        :return: no symbols if the listing isn't available
+        """
+        index = self.universe.index(download=False)
+        if index is None:
+            return []
+        return index.search(symbolName, limit=limit)["symbol"].tolist()
+
+    def quoteURL(self, symbolName: str) -> str:
+        url = f"{self.apiURL}function=GLOBAL_QUOTE&symbol={symbolName}&apikey={self.apiKey}"
         logger.debug(f"URL for checking if symbol exists is : {url}")
-        r = requests.get(url)
-        data: Dict = r.json()
+        return url
 
-        return bool(data["Global Quote"])  # check if
+    def parseQuote(self, symbolName: str, data: Dict) -> bool:
+        if "Global Quote" not in data:
+            # throttled or informational answer : don't reject a symbol we can't check
+            logger.warning(f"Could not validate {symbolName} : {data}")
+            return True
+        return bool(data["Global Quote"])
+
+    def checkSymbolExists(self, symbolName: str) -> bool:
+        # the listing confirms US symbols offline, the others cost one GLOBAL_QUOTE request
+        if self.isListed(symbolName):
+            return True
+        return self.parseQuote(symbolName, self.transport.getJSON(self.quoteURL(symbolName)))
+
+    async def acheckSymbolExists(self, symbolName: str) -> bool:
+        # reading or downloading the listing blocks, off the event loop
+        if await asyncio.to_thread(self.isListed, symbolName):
+            return True
+        return self.parseQuote(
+            symbolName, await self.transport.agetJSON(self.quoteURL(symbolName))
+        )
+
+    @classmethod
+    def reset(cls) -> None:
+        super().reset()
+        cls.dataType = os.environ.get(cls.dataTypeKeyName, "json")
+        # cache directory and refresh interval may have changed
+        cls.universe = createUniverse()
 
     @classmethod
-    def find(cls, stockName: str) -> pd.DataFrame:
+    def find(cls, stockName: str, limit: int = 10) -> pd.DataFrame:
         """
-        Check if the stock exists exists
-        :param stockName:
+        Searches the local symbol listing by ticker, name and region
+        :param stockName: ticker or company name, partial or misspelled
+        :param limit: maximum number of matches
         :return:
         """
-        # function name and symbol name
-        functionName: str = "SYMBOL_SEARCH"
-        symbol: str = stockName
-
-        url = (
-            f"{cls.apiURL}function={functionName}&keywords={symbol}&apikey={cls.apiKey}"
-        )
-        logger.debug(f"URL for finding stocks is : {url}")
-        r = requests.get(url)
-        data: Dict = r.json()
-
-        df = pd.DataFrame(data["bestMatches"])
-        df.columns = [
-            "Symbol",
-            "Name",
-            "Type",
-            "Region",
-            "MarketOpen",
-            "MarketClose",
-            "Timezone",
-            "Currency",
-            "MatchScore",
-        ]
+        df = cls.universe.index().search(stockName, limit=limit)
+        df = df[["symbol", "name", "assetType", "region", "exchange", "MatchScore"]]
+        df.columns = ["Symbol", "Name", "Type", "Region", "Exchange", "MatchScore"]
         return df
 
-    def getFundamentalData(self) -> (pd.DataFrame, pd.DataFrame):
-        """
-        This function returns the fundamental data for the quarterly and annual data
-        :return:
-        """
+    @classmethod
+    async def afind(cls, stockName: str, limit: int = 10) -> pd.DataFrame:
+        # loading the listing may download it, off the event loop
+        return await asyncio.to_thread(cls.find, stockName, limit)
+
+    def fundamentalDataURL(self) -> str:
         functionName: str = "BALANCE_SHEET"
         symbol: str = self.element
 
@@ -149,8 +162,10 @@ class AlphaVantageStockDataSource(DataSourceBase):
             f"{self.apiURL}function={functionName}&symbol={symbol}&apikey={self.apiKey}"
         )
         logger.debug(f"URL for gettign fundamental data is : {url}")
-        r = requests.get(url)
-        data = r.json()
+        return url
+
+    def parseFundamentalData(self, data: Dict) -> (pd.DataFrame, pd.DataFrame):
+        symbol: str = self.element
 
         quaterlyFundamentaData: pd.DataFrame = pd.DataFrame(data["quarterlyReports"])
         annualFundamentaData: pd.DataFrame = pd.DataFrame(data["annualReports"])
@@ -178,10 +193,27 @@ class AlphaVantageStockDataSource(DataSourceBase):
         quaterlyFundamentaData.sort_index(ascending=True, inplace=True)
         annualFundamentaData.set_index("fiscalDateEnding", inplace=True)
         annualFundamentaData.sort_index(ascending=True, inplace=True)
-        rich_dataframe.prettify(quaterlyFundamentaData)
 
         return quaterlyFundamentaData, annualFundamentaData
 
+    def fetchFundamentalData(self) -> (pd.DataFrame, pd.DataFrame):
+        data = self.transport.getJSON(self.fundamentalDataURL())
+        return self.parseFundamentalData(data)
+
+    def getFundamentalData(self) -> (pd.DataFrame, pd.DataFrame):
+        """
+        This function returns the fundamental data for the quarterly and annual data.
+        It is downloaded on first use only, as it costs a request of the API quota.
+        :return:
+        """
+        if self.fundamentalData is None:
+            self.fundamentalData = self.fetchFundamentalData()
+        return self.fundamentalData
+
+    async def agetFundamentalData(self) -> (pd.DataFrame, pd.DataFrame):
+        data = await self.transport.agetJSON(self.fundamentalDataURL())
+        return self.parseFundamentalData(data)
+
     def format_number(data_value, indx):
         if data_value >= 1_000_000:
             formatter = "{:1.1f}M".format(data_value * 0.000_001)
@@ -190,7 +222,12 @@ class AlphaVantageStockDataSource(DataSourceBase):
         return formatter
 
     def plotFundamentalData(self, df):
-        fig, ax = plt.subplots(nrows=1)
+        from matplotlib.ticker import FuncFormatter
+
+        # the figure is reused, its axes and the twin axes are recreated
+        fig = plots.figure("plotFund")
+        fig.clear()
+        ax = fig.subplots(nrows=1)
 
         ###################################
         # Plot liabilities / assets ratio #
@@ -233,201 +270,41 @@ class AlphaVantageStockDataSource(DataSourceBase):
 
 
 
-class StockLoop:
+class StockLoop(SourceSectionLoop):
     sectionName: str = 'stock'
 
     sourceClassMapping: Dict[str, object] = {"av": AlphaVantageStockDataSource}
-    commands: List[str] = [
-        "load",
-        "find",
-        "fi",
-        "plotLine",
-        "pl",
-        "quit",
-        "q",
-        "help",
-        "h",
-    ]
     classToUse = AlphaVantageStockDataSource
     classInstance = None
 
-    def runLoop(self):
+    def completer(self):
+        from completers import SymbolCompleter
 
-        # Print help message
-        helpMessage = (
-            f"[red]Welcome to {self.sectionName} section. Choose from the following choices."
-            f"\n Choose from the following : [yellow]{self.commands}"
-        )
-        console.print(helpMessage)
-
-        # Parser for parsing the command
-        stockParser = argparse.ArgumentParser(prog="stock", add_help=True)
-        stockParser.add_argument("cmd", choices=self.commands)
-
-        continueStockLoop: bool = True
-        while continueStockLoop:
-            userInput = session.prompt(f"{self.sectionName}>> ", completer=WordCompleter(self.commands))
-
-            # Parse main command of the list of possible self.commands
-            try:
-                (stockParserArgs, l_args) = stockParser.parse_known_args(
-                    userInput.lower().split()
-                )
-            except SystemExit:
-                console.print(
-                    f"[red]The command selected doesn't exist. Available commands are : {self.commands}"
-                )
-                continue
-
-            ################
-            # Quit program #
-            ################
-            if stockParserArgs.cmd in ("help", "h"):
-                console.print(helpMessage)
-
-            ################
-            # Quit program #
-            ################
-            elif stockParserArgs.cmd in ("quit", "q"):
-                console.print(f"[red]Exiting {self.sectionName} section")
-                continueStockLoop = False
-
-            ################
-            # Clear screen #
-            ################
-            elif stockParserArgs.cmd == "cls":
-                os.system("cls||clear")
-
-            ################
-            # Load program #
-            ################
-            elif stockParserArgs.cmd in ("load"):
-                ##########################
-                # Create load parameters #
-                ##########################
-                loadParser = argparse.ArgumentParser(prog="load")
-                loadParser.add_argument("--ticker", "-t", type=str, required=True)
-                loadParser.add_argument(
-                    "--source",
-                    choices=[list(self.sourceClassMapping.keys())],
-                    default="av",
-                )
-
-                try:
-                    (loadParserArgs, largs) = loadParser.parse_known_args(
-                        userInput.split()
-                    )
-                except SystemExit:
-                    console.print("[red]Invalid arguments")
-                    continue
-
-                ###########################
-                # Load data for the stock #
-                ###########################
-
-                try:
-                    # Check if the source they have chosen is correct
-                    assert (
-                        loadParserArgs.source in self.sourceClassMapping.keys()
-                    ), Exception(
-                        f"Source {loadParserArgs.source} not defined. Valid values are: {list(self.sourceClassMapping.keys())}"
-                    )
-
-                    # Check if we have the correct class
-                    self.classToUse = self.sourceClassMapping[loadParserArgs.source]
-                    self.classInstance = self.sourceClassMapping[loadParserArgs.source](stockName=loadParserArgs.ticker)
-                except Exception as error:
-                    console.print(f"[red]{error}")
-
-            ################
-            # Plot Program #
-            ################
-            elif stockParserArgs.cmd in ("plotLine", "pl"):
-                if self.classInstance is not None:
-                    ##############################
-                    # Create plotLine parameters #
-                    ##############################
-                    viewParser = argparse.ArgumentParser(prog="plotLine")
-                    viewParser.add_argument(
-                        "--type",
-                        type=str,
-                        required=False,
-                        default="line",
-                        choices=["line", "ohlc"],
-                    )
-                    viewParser.add_argument(
-                        "--startDate",
-                        type=lambda d: datetime.datetime.strptime(d, "%Y-%m-%d"),
-                        help="The starting date (format YYYY-MM-DD)",
-                        default=datetime.datetime.today()
-                        - datetime.timedelta(days=365),
-                    )
-                    viewParser.add_argument(
-                        "--endDate",
-                        type=lambda d: datetime.datetime.strptime(d, "%Y-%m-%d"),
-                        help="The ending date (format YYYY-MM-DD)",
-                        default=datetime.datetime.today(),
-                    )
-                    viewParser.add_argument(
-                        "--adjust",
-                        type=int,
-                        help="",
-                        default=1,
-                    )
-                    try:
-                        (viewParserArgs, largs) = viewParser.parse_known_args(
-                            userInput.split()
-                        )
-                    except SystemExit:
-                        console.print("[red]Invalid arguemnts")
-                        continue
-
-                    ###########################
-                    # Load data for the stock #
-                    ###########################
-                    try:
-                        df = self.classInstance.loadDaily(
-                            startDate=ciso8601.parse_datetime(
-                                str(viewParserArgs.startDate)
-                            ),
-                            endDate=ciso8601.parse_datetime(
-                                str(viewParserArgs.endDate)
-                            ),
-                        )
-                        self.classInstance.plotLine(
-                            df, plotGlobalEvents=True, adjust=viewParserArgs.adjust
-                        )
-                        plt.show()
-                    except Exception as err:
-                        console.print(f"[red]{err}")
-                else:
-                    console.print("[red]currency not loaded. Use load command")
-
-            ################
-            # Find program #
-            ################
-            elif stockParserArgs.cmd in ("find", "fi"):
-                #########################
-                # Create cmd parameters #
-                #########################
-                findParser = argparse.ArgumentParser(prog="find")
-                findParser.add_argument("--keyword", type=str, required=True)
-
-                try:
-                    (findParserArgs, largs) = findParser.parse_known_args(
-                        userInput.split()
-                    )
-                except SystemExit:
-                    console.print("[red]Invalid arguemnts")
-                    continue
-
-                ###########################
-                # Load data for the stock #
-                ###########################
-                console.print(f"Results for : {findParserArgs.keyword}")
-                searchResultsDF: pd.DataFrame = self.classToUse.find(findParserArgs.keyword)
-                rich_dataframe.prettify(searchResultsDF) # print the results
-
-            else:
-                console.print(f"[red]The command selected doesn't exist. Available commands are : {self.commands}")
-                continue
+        return SymbolCompleter(self.commandNames(), self.classToUse.universe)
+
+    @command(
+        "load",
+        arguments=[
+            argument("--ticker", "-t", type=str, required=True),
+            argument("--source", choices=list(sourceClassMapping.keys()), default="av"),
+        ],
+        help="Loads a stock",
+    )
+    def loadCommand(self, args: argparse.Namespace) -> None:
+        self.loadSource(args.source, stockName=args.ticker)
+
+    @command("plotFund", "pf", help="Plots the fundamental data of the loaded stock")
+    def plotFundCommand(self, args: argparse.Namespace) -> None:
+        from rich_dataframe import rich_dataframe
+
+        if self.classInstance is None:
+            self.reportError("Stock not loaded. Use load command")
+            return
+
+        try:
+            quaterlyFundamentaData, annualFundamentaData = self.classInstance.getFundamentalData()
+            rich_dataframe.prettify(quaterlyFundamentaData)
+            fig, ax = self.classInstance.plotFundamentalData(quaterlyFundamentaData)
+            showFigure(fig, f"{self.sectionName}_{self.classInstance.element}_plotFund")
+        except Exception as err:
+            self.reportError(err)
@@ -0,0 +1,182 @@
+import datetime
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from loguru import logger
+
+
+class TimeSeriesStore:
+    """
+    Canonical on-disk store of daily bars for every asset class.
+
+    Series are stored as parquet files laid out as
+    ``<storeDir>/<assetClass>/<source>/<symbol>.parquet`` with one fixed schema :
+    a datetime64 Date column and float64 Open, High, Low, Close, Volume columns
+    (NaN where the asset class has no such field, e.g. forex volume). Files are
+    sorted by date and split in row groups, so date range reads only decode the
+    row groups they need, and are read through a memory map.
+    """
+
+    storeDirKeyName: str = "OPENTERMINAL_STORE_DIR"
+    columns: List[str] = ["Open", "High", "Low", "Close", "Volume"]
+    schema: pa.Schema = pa.schema(
+        [("Date", pa.timestamp("ns"))] + [(column, pa.float64()) for column in columns]
+    )
+    # about four years of daily bars per row group
+    rowGroupSize: int = 1024
+
+    def __init__(self, storeDir: Union[str, Path, None] = None):
+        """
+        :param storeDir: root directory of the store (env: OPENTERMINAL_STORE_DIR)
+        """
+        self.storeDir = Path(
+            storeDir or os.environ.get(self.storeDirKeyName, "~/.openterminal/store")
+        ).expanduser()
+
+    def path(self, assetClass: str, source: str, symbol: str) -> Path:
+        parts = [re.sub(r"[^A-Za-z0-9.\-]+", "_", x) for x in (assetClass, source, symbol)]
+        return self.storeDir.joinpath(parts[0], parts[1], f"{parts[2]}.parquet")
+
+    def exists(self, assetClass: str, source: str, symbol: str) -> bool:
+        return self.path(assetClass, source, symbol).exists()
+
+    def toTable(self, df: pd.DataFrame) -> pa.Table:
+        """
+        Converts a frame indexed by date to the store schema
+        :param df:
+        :return:
+        """
+        df = df.sort_index()
+        arrays = [pa.array(df.index.to_numpy(dtype="datetime64[ns]"))]
+        for column in self.columns:
+            if column in df.columns:
+                arrays.append(pa.array(df[column].to_numpy(dtype=np.float64)))
+            else:
+                arrays.append(pa.array(np.full(len(df), np.nan)))
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def write(self, assetClass: str, source: str, symbol: str, df: pd.DataFrame) -> None:
+        """
+        Writes the whole series of symbol, replacing the stored one
+        :param assetClass: e.g. "stock", "forex"
+        :param source: e.g. "alphavantage"
+        :param symbol:
+        :param df: frame indexed by date with some of the columns of the schema
+        :return:
+        """
+        path = self.path(assetClass, source, symbol)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # write to a temporary file first so readers never see a partial file. Each
+        # writer gets its own, as a prefetch and a load (or two processes) may write
+        # the same symbol at once : the last replace wins.
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f"{path.stem}.", suffix=".tmp", delete=False
+        ) as file:
+            tmpPath = file.name
+            try:
+                pq.write_table(self.toTable(df), file, row_group_size=self.rowGroupSize)
+            except BaseException:
+                file.close()
+                os.remove(tmpPath)
+                raise
+        os.replace(tmpPath, path)
+        logger.debug(f"Store write : {path}")
+
+    @staticmethod
+    def dateFilters(
+        startDate: Union[datetime.date, None], endDate: Union[datetime.date, None]
+    ) -> Union[List[tuple], None]:
+        filters = []
+        if startDate is not None:
+            filters.append(("Date", ">=", pd.Timestamp(startDate)))
+        if endDate is not None:
+            filters.append(("Date", "<=", pd.Timestamp(endDate)))
+        return filters or None
+
+    def readTable(
+        self,
+        path: Path,
+        startDate: Union[datetime.date, None] = None,
+        endDate: Union[datetime.date, None] = None,
+        columns: Union[Sequence[str], None] = None,
+    ) -> pa.Table:
+        return pq.read_table(
+            path,
+            columns=None if columns is None else ["Date", *columns],
+            filters=self.dateFilters(startDate, endDate),
+            memory_map=True,
+        )
+
+    def read(
+        self,
+        assetClass: str,
+        source: str,
+        symbol: str,
+        startDate: Union[datetime.date, None] = None,
+        endDate: Union[datetime.date, None] = None,
+        columns: Union[Sequence[str], None] = None,
+    ) -> Union[pd.DataFrame, None]:
+        """
+        Reads the bars of symbol between startDate and endDate (inclusive)
+        :param assetClass:
+        :param source:
+        :param symbol:
+        :param startDate: None for the start of the series
+        :param endDate: None for the end of the series
+        :param columns: subset of the schema columns, all by default
+        :return: frame indexed by date, or None if the symbol isn't stored
+        """
+        path = self.path(assetClass, source, symbol)
+        if not path.exists():
+            return None
+        return self.readTable(path, startDate, endDate, columns).to_pandas().set_index("Date")
+
+    def readMany(
+        self,
+        assetClass: str,
+        source: str,
+        symbols: Union[Sequence[str], None] = None,
+        startDate: Union[datetime.date, None] = None,
+        endDate: Union[datetime.date, None] = None,
+        columns: Union[Sequence[str], None] = None,
+    ) -> pd.DataFrame:
+        """
+        Reads the bars of many symbols into one long format frame
+        :param assetClass:
+        :param source:
+        :param symbols: stored symbols to read, all of them by default
+        :param startDate:
+        :param endDate:
+        :param columns:
+        :return: frame with a Symbol and a Date column
+        """
+        tables = []
+        for symbol in self.symbols(assetClass, source) if symbols is None else symbols:
+            path = self.path(assetClass, source, symbol)
+            if not path.exists():
+                logger.warning(f"{symbol} not found in store : {path.parent}")
+                continue
+            table = self.readTable(path, startDate, endDate, columns)
+            symbolColumn = pa.array([symbol] * table.num_rows, pa.string())
+            tables.append(table.add_column(0, "Symbol", symbolColumn))
+        if not tables:
+            return pd.DataFrame(columns=["Symbol", "Date", *(columns or self.columns)])
+        return pa.concat_tables(tables).to_pandas()
+
+    def symbols(self, assetClass: str, source: str) -> List[str]:
+        """
+        Returns the stored symbols, as file names
+        :param assetClass:
+        :param source:
+        :return:
+        """
+        directory = self.path(assetClass, source, "_").parent
+        return sorted(path.stem for path in directory.glob("*.parquet"))
@@ -0,0 +1,152 @@
+import bisect
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class SymbolIndex:
+    """
+    In-memory search index over a symbol listing.
+
+    Symbols and names are kept in sorted arrays for prefix lookups with bisect,
+    and every searchable column is split into trigrams for fuzzy matching. Fuzzy
+    scores are the Dice coefficient between the trigrams of the query and of the
+    row, computed for all rows at once with np.bincount.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        symbolColumn: str,
+        nameColumn: str,
+        searchColumns: Sequence[str],
+    ):
+        """
+        :param df: listing to index
+        :param symbolColumn: column holding the ticker / code
+        :param nameColumn: column holding the full name
+        :param searchColumns: columns used for fuzzy matching
+        """
+        self.df = df.reset_index(drop=True)
+        self.symbols = self.df[symbolColumn].astype(str).to_numpy()
+        self.names = self.df[nameColumn].astype(str).to_numpy()
+
+        # sorted keys for prefix search
+        symbols = np.char.upper(self.symbols.astype(str))
+        names = np.char.upper(self.names.astype(str))
+        self.symbolOrder = np.argsort(symbols, kind="stable")
+        self.sortedSymbols: List[str] = symbols[self.symbolOrder].tolist()
+        self.nameOrder = np.argsort(names, kind="stable")
+        self.sortedNames: List[str] = names[self.nameOrder].tolist()
+
+        # trigram -> rows containing it
+        postings: Dict[str, List[int]] = {}
+        self.rowTrigramCount = np.zeros(self.df.shape[0], dtype=np.int64)
+        columns = [self.df[column].astype(str) for column in searchColumns]
+        text = columns[0].str.cat(columns[1:], sep=" ")
+        for row, value in enumerate(text.str.upper()):
+            trigrams = self.trigrams(value)
+            self.rowTrigramCount[row] = len(trigrams)
+            for trigram in trigrams:
+                postings.setdefault(trigram, []).append(row)
+        self.postings: Dict[str, np.ndarray] = {
+            trigram: np.asarray(rows, dtype=np.int64) for trigram, rows in postings.items()
+        }
+
+    @staticmethod
+    def trigrams(value: str) -> set:
+        """
+        Returns the set of trigrams of every word, padded so short words and word
+        starts get their own trigrams
+        :param value:
+        :return:
+        """
+        result = set()
+        for word in value.split():
+            word = f"  {word} "
+            result.update(word[i : i + 3] for i in range(len(word) - 2))
+        return result
+
+    @staticmethod
+    def prefixRange(sortedKeys: List[str], query: str) -> range:
+        start = bisect.bisect_left(sortedKeys, query)
+        end = bisect.bisect_left(sortedKeys, query + "\uffff", lo=start)
+        return range(start, end)
+
+    def prefix(self, query: str, limit: int = 10) -> List[int]:
+        """
+        Returns the rows whose symbol, then name, starts with query
+        :param query:
+        :param limit:
+        :return:
+        """
+        query = query.upper()
+        rows: List[int] = []
+        for sortedKeys, order in (
+            (self.sortedSymbols, self.symbolOrder),
+            (self.sortedNames, self.nameOrder),
+        ):
+            for i in self.prefixRange(sortedKeys, query):
+                if len(rows) >= limit:
+                    return rows
+                if order[i] not in rows:
+                    rows.append(int(order[i]))
+        return rows
+
+    def fuzzyScores(self, query: str) -> np.ndarray:
+        """
+        Returns the Dice similarity between the query and every row
+        :param query:
+        :return:
+        """
+        queryTrigrams = self.trigrams(query.upper())
+        scores = np.zeros(self.df.shape[0])
+        matches = [self.postings[t] for t in queryTrigrams if t in self.postings]
+        if not matches:
+            return scores
+
+        common = np.bincount(np.concatenate(matches), minlength=self.df.shape[0])
+        return 2 * common / (len(queryTrigrams) + self.rowTrigramCount)
+
+    def searchRows(
+        self, query: str, limit: int = 10, minScore: float = 0.0
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the positions and scores of the best matches for query, best first.
+        Exact and prefix matches are ranked above fuzzy matches.
+        :param query:
+        :param limit:
+        :param minScore: matches scoring below this are dropped
+        :return: (rows, scores)
+        """
+        query = query.strip().upper()
+        if not query or self.df.empty:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        scores = self.fuzzyScores(query) * 0.8
+        for rank, row in enumerate(self.prefix(query, limit)):
+            scores[row] = max(scores[row], 0.9 - rank * 1e-3)
+        for i in self.prefixRange(self.sortedSymbols, query):
+            if self.sortedSymbols[i] != query:
+                break
+            scores[self.symbolOrder[i]] = 1.0
+
+        scores[scores < minScore] = 0
+        limit = min(limit, int(np.count_nonzero(scores)))
+        if limit == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return best, scores[best]
+
+    def search(self, query: str, limit: int = 10, minScore: float = 0.0) -> pd.DataFrame:
+        """
+        Returns the best matches for query as rows of the listing with a MatchScore column
+        :param query:
+        :param limit:
+        :param minScore: matches scoring below this are dropped
+        :return:
+        """
+        rows, scores = self.searchRows(query, limit, minScore)
+        return self.df.iloc[rows].assign(MatchScore=scores.round(4))
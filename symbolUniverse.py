@@ -0,0 +1,174 @@
+import datetime
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Set, Union
+
+import pandas as pd
+from loguru import logger
+
+from rateLimiter import AlphaVantageScheduler
+from symbolIndex import SymbolIndex
+
+
+class SymbolUniverse:
+    """
+    Local copy of the Alpha Vantage LISTING_STATUS dump (every active listed symbol).
+
+    The dump is downloaded once into the cache directory and refreshed when it is
+    older than refreshInterval, so symbol validation doesn't need a request.
+    """
+
+    refreshIntervalKeyName: str = "OPENTERMINAL_LISTING_REFRESH_DAYS"
+    # wait between two refresh attempts of a stale listing after a failed download
+    retryInterval: datetime.timedelta = datetime.timedelta(hours=1)
+    # LISTING_STATUS only covers US exchanges
+    exchangeRegions: Dict[str, str] = {
+        "NYSE": "United States",
+        "NASDAQ": "United States",
+        "NYSE ARCA": "United States",
+        "NYSE MKT": "United States",
+        "BATS": "United States",
+    }
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        transport: AlphaVantageScheduler,
+        apiURL: str = "https://www.alphavantage.co/query?",
+        apiKeyName: str = "ALPHA_VANTAGE_API_KEY",
+        refreshInterval: Union[datetime.timedelta, None] = None,
+    ):
+        """
+        :param path: location of the listing file
+        :param transport: transport used to download the listing
+        :param apiURL:
+        :param apiKeyName: environment variable holding the API key
+        :param refreshInterval: maximum age of the listing (env: OPENTERMINAL_LISTING_REFRESH_DAYS)
+        """
+        self.path = Path(path)
+        self.transport = transport
+        self.apiURL = apiURL
+        self.apiKeyName = apiKeyName
+        self.refreshInterval = refreshInterval or datetime.timedelta(
+            days=float(os.environ.get(self.refreshIntervalKeyName, 7))
+        )
+        self.df: Union[pd.DataFrame, None] = None
+        self.symbols: Set[str] = set()
+        self.symbolIndex: Union[SymbolIndex, None] = None
+        # time of the last download attempt
+        self.lastAttempt: Union[datetime.datetime, None] = None
+        self.lock = threading.Lock()
+
+    def isStale(self) -> bool:
+        if not self.path.exists():
+            return True
+        age = datetime.datetime.now() - datetime.datetime.fromtimestamp(
+            self.path.stat().st_mtime
+        )
+        return age > self.refreshInterval
+
+    def canRetry(self) -> bool:
+        return (
+            self.lastAttempt is None
+            or datetime.datetime.now() - self.lastAttempt > self.retryInterval
+        )
+
+    def needsLoad(self) -> bool:
+        """
+        True if the listing isn't loaded yet, or is stale and may be refreshed now
+        :return:
+        """
+        return self.df is None or (self.isStale() and self.canRetry())
+
+    def download(self) -> None:
+        """
+        Downloads the listing file
+        :return:
+        """
+        url = f"{self.apiURL}function=LISTING_STATUS&apikey={os.environ.get(self.apiKeyName, 'demo')}"
+        logger.debug(f"Downloading symbol listing to : {self.path}")
+        r = self.transport.get(url)
+        assert r.content.startswith(b"symbol"), Exception(
+            f"Unexpected symbol listing response : {r.text[:200]}"
+        )
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmpPath = self.path.with_suffix(".tmp")
+        tmpPath.write_bytes(r.content)
+        os.replace(tmpPath, self.path)
+
+    def read(self) -> pd.DataFrame:
+        """
+        Reads the listing file, without downloading it
+        :return:
+        """
+        df = pd.read_csv(self.path, keep_default_na=False)
+        df["region"] = df["exchange"].map(self.exchangeRegions).fillna(df["exchange"])
+        self.df = df
+        self.symbols = set(df["symbol"].str.upper())
+        self.symbolIndex = None
+        return self.df
+
+    def load(self) -> pd.DataFrame:
+        """
+        Returns the listing, downloading it first if it is missing or stale. A stale
+        listing is still used if the download fails, and the download isn't attempted
+        again before retryInterval.
+        :return:
+        """
+        with self.lock:
+            refreshed = False
+            if self.isStale() and self.canRetry():
+                self.lastAttempt = datetime.datetime.now()
+                try:
+                    self.download()
+                    refreshed = True
+                except Exception as error:
+                    if not self.path.exists():
+                        raise
+                    logger.warning(
+                        f"Using stale symbol listing until the next attempt in {self.retryInterval}. Refresh failed : {error}"
+                    )
+
+            # the loaded listing is kept unless a new one was downloaded
+            if self.df is not None and not refreshed:
+                return self.df
+            assert self.path.exists(), Exception(
+                f"Symbol listing unavailable, last download attempt at {self.lastAttempt} failed"
+            )
+            return self.read()
+
+    def contains(self, symbol: str) -> bool:
+        if self.needsLoad():
+            self.load()
+        return symbol.upper() in self.symbols
+
+    def index(self, download: bool = True) -> Union[SymbolIndex, None]:
+        """
+        Returns the search index over symbol, name and region, building it on first use
+        :param download: False to only use the listing already on disk, e.g. while typing
+        :return: None if download is False and no listing is available
+        """
+        if download and self.needsLoad():
+            self.load()
+        elif self.df is None:
+            if not self.path.exists():
+                return None
+            with self.lock:
+                if self.df is None:
+                    self.read()
+        if self.symbolIndex is None:
+            self.symbolIndex = SymbolIndex(
+                self.df,
+                symbolColumn="symbol",
+                nameColumn="name",
+                searchColumns=["symbol", "name", "region"],
+            )
+        return self.symbolIndex
+
+    def clear(self) -> None:
+        with self.lock:
+            self.df = None
+            self.symbols = set()
+            self.symbolIndex = None
@@ -1,249 +1,163 @@
 import argparse
-import datetime
+import importlib
 import os
-import subprocess
 import sys
+from typing import Dict, List, Tuple
 
-import ciso8601
 import dotenv
-import matplotlib.pyplot as plt
-import pandas as pd
-import rich_dataframe
-from prompt_toolkit.completion import WordCompleter
 
-from common import session, console
-from forexDataSourceBase import ForexLoop
-from stockSource import AlphaVantageStockDataSource, StockLoop
+import common
+from commands import SectionLoop, SourceSectionLoop, command
+from common import console
 
 ########################
 # Load env config file #
 ########################
 dotenv.load_dotenv()
 
-main_parser = argparse.ArgumentParser(prog="terminal", add_help=True)
-commands = [
-        "quit",
-        "q",
-        # "plotLine",
-        # "plotFund",
-        # "find",
-        # "load",
-        "reset",
-        "r",
-        "cls",
-        "forex",
-        "stock",
-    ]
-main_parser.add_argument(
-    "cmd",
-    choices=[
-        "quit",
-        "q",
-        # "plotLine",
-        # "plotFund",
-        # "find",
-        # "load",
-        "reset",
-        "r",
-        "cls",
-        "forex",
-        "stock",
-    ],
+batch_parser = argparse.ArgumentParser(
+    prog="terminal",
+    description="Runs the given commands without prompting, saving charts to files, then exits. "
+    "e.g. terminal.py --output charts stock load -t IBM plotLine --startDate 2020-01-01",
 )
-os.system("cls||clear")
-console.print(
-    "Welcome to stock bot. Choose from the following choices.\n"
-    f"{commands}"
-
+batch_parser.add_argument(
+    "--script", type=str, help="file with one command per line, as typed at the prompt"
+)
+batch_parser.add_argument(
+    "--output", type=str, default="charts", help="directory the charts are saved to"
+)
+batch_parser.add_argument(
+    "commands", nargs=argparse.REMAINDER, help="section and commands, e.g. stock load -t IBM pl"
 )
 
-continueLoop: bool = True
 
-while continueLoop:
+def reset() -> None:
+    """
+    Rebuilds the in-memory state in place : reloads .env and resets the data
+    sources that were imported. The on-disk cache is kept.
+    :return:
+    """
+    dotenv.load_dotenv(override=True)
+    # nothing to reset if no source was used yet
+    if "sources" in sys.modules:
+        from sources import resetSources
 
+        resetSources()
 
-    userInput = session.prompt("Main>> ", completer=WordCompleter(commands))
 
-    # Parse main command of the list of possible commands
-    try:
-        (mainParserArgs, l_args) = main_parser.parse_known_args(userInput.split())
-    except SystemExit:
-        console.print(f"The command selected doesn't exist\n")
-        continue
+class MainLoop(SectionLoop):
+    sectionName: str = "Main"
 
-    # Quit program
-    if mainParserArgs.cmd in ("quit", "q"):
+    # section name -> (module, loop class). The data sources, pandas and matplotlib
+    # are imported when a section is entered, so the prompt shows up without
+    # paying for them at startup
+    sections: Dict[str, Tuple[str, str]] = {
+        "forex": ("forexDataSourceBase", "ForexLoop"),
+        "stock": ("stockSource", "StockLoop"),
+    }
+
+    @classmethod
+    def sectionClass(cls, name: str) -> type:
+        moduleName, className = cls.sections[name]
+        return getattr(importlib.import_module(moduleName), className)
+
+    @command("quit", "q", help="Quits the terminal")
+    def quitCommand(self, args: argparse.Namespace) -> bool:
         console.print("[red]Quitting. Good bye.")
-        continueLoop = False
+        return False
 
-    if mainParserArgs.cmd == "reset" or mainParserArgs.cmd == "r":
+    @command("reset", "r", help="Reloads .env and resets the data sources")
+    def resetCommand(self, args: argparse.Namespace) -> None:
         console.print("[red]Resetting...")
-        continueLoop = False
+        reset()
         os.system("cls||clear")
-        subprocess.run(  # nosec
-            f"{sys.executable} terminal.py", shell=True, check=False
-        )
         console.print("Done")
 
-    if mainParserArgs.cmd == "cls":
-        os.system("cls||clear")
-
-    # Load program
-    if mainParserArgs.cmd == "load":
-
-        ##############################
-        # Create load parameters #
-        ##############################
-        loadParser = argparse.ArgumentParser(prog="load")
-        loadParser.add_argument("--ticker", type=str, required=False)
-        # loadParser.add_argument(
-        #     "--startDate",
-        #     type=lambda d: datetime.datetime.strptime(d, "%Y-%m-%d"),
-        #     help="The starting date (format YYYY-MM-DD) of the stock",
-        #     default=datetime.datetime.today() - datetime.timedelta(days=365),
-        # )
-        # loadParser.add_argument(
-        #     "--endDate",
-        #     type=lambda d: datetime.datetime.strptime(d, "%Y-%m-%d"),
-        #     help="The starting date (format YYYY-MM-DD) of the stock",
-        #     default=datetime.datetime.today(),
-        # )
-        try:
-            (loadParserArgs, largs) = loadParser.parse_known_args(userInput.split())
-        except SystemExit:
-            console.print("[red]Invalid arguemnts")
-            continue
-
-        ###########################
-        # Load data for the stock #
-        ###########################
-
-        try:
-            ss: AlphaVantageStockDataSource = AlphaVantageStockDataSource(
-                stockName=loadParserArgs.ticker
-            )
-        except Exception as error:
-            console.log(error)
-
-    # Load program
-    if mainParserArgs.cmd == "plotLine":
-
-        ##############################
-        # Create plotLine parameters #
-        ##############################
-        viewParser = argparse.ArgumentParser(prog="plotLine")
-        viewParser.add_argument(
-            "--type", type=str, required=False, default="line", choices=["line", "ohlc"]
-        )
-        viewParser.add_argument(
-            "--startDate",
-            type=lambda d: datetime.datetime.strptime(d, "%Y-%m-%d"),
-            help="The starting date (format YYYY-MM-DD)",
-            default=datetime.datetime.today() - datetime.timedelta(days=365),
-        )
-        viewParser.add_argument(
-            "--endDate",
-            type=lambda d: datetime.datetime.strptime(d, "%Y-%m-%d"),
-            help="The starting date (format YYYY-MM-DD)",
-            default=datetime.datetime.today(),
-        )
-        try:
-            (viewParserArgs, largs) = viewParser.parse_known_args(userInput.split())
-        except SystemExit:
-            console.print("[red]Invalid arguemnts")
-            continue
-
-        ###########################
-        # Load data for the stock #
-        ###########################
-        try:
-            df = ss.loadDaily(
-                startDate=ciso8601.parse_datetime(str(viewParserArgs.startDate)),
-                endDate=ciso8601.parse_datetime(str(viewParserArgs.endDate)),
-            )
-            ss.plotLine(df, plotGlobalEvents=True)
-            plt.show()
-        except Exception as err:
-            console.print(f"[red]{err}")
-
-    # Load program
-    if mainParserArgs.cmd == "plotFund":
-
-        ##############################
-        # Create plotLine parameters #
-        ##############################
-        viewParser = argparse.ArgumentParser(prog="plotFund")
-        # # viewParser.add_argument(
-        # #     "--type", type=str, required=False, default="line", choices=["line", "ohlc"]
-        # # )
-        # # viewParser.add_argument(
-        # #     "--startDate",
-        # #     type=lambda d: datetime.datetime.strptime(d, "%Y-%m-%d"),
-        # #     help="The starting date (format YYYY-MM-DD) of the stock",
-        # #     default=datetime.datetime.today() - datetime.timedelta(days=365),
-        # # )
-        # # viewParser.add_argument(
-        # #     "--endDate",
-        # #     type=lambda d: datetime.datetime.strptime(d, "%Y-%m-%d"),
-        # #     help="The starting date (format YYYY-MM-DD) of the stock",
-        # #     default=datetime.datetime.today(),
-        # # )
-        # try:
-        #     (viewParserArgs, largs) = viewParser.parse_known_args(userInput.split())
-        # except SystemExit:
-        #     console.print("[red]Invalid arguemnts")
-        #     continue
-
-        ###########################
-        # Load data for the stock #
-        ###########################
-        try:
-            quaterlyFundamentaData, annualFundamentaData = ss.getFundamentalData()
-            ss.plotFundamentalData(quaterlyFundamentaData)
-            plt.show()
-        except Exception as err:
-            console.print(f"[red]{err}")
-
-    # Find program
-    if mainParserArgs.cmd == "find":
-
-        #########################
-        # Create cmd parameters #
-        #########################
-        findParser = argparse.ArgumentParser(prog="find")
-        findParser.add_argument("--keyword", type=str, required=True)
-
-        try:
-            (findParserArgs, largs) = findParser.parse_known_args(userInput.split())
-        except SystemExit:
-            console.print("[red]Invalid arguemnts")
+    @command("forex", help="Enters the forex section")
+    def forexCommand(self, args: argparse.Namespace) -> SectionLoop:
+        return self.sectionClass("forex")()
+
+    @command("stock", help="Enters the stock section")
+    def stockCommand(self, args: argparse.Namespace) -> SectionLoop:
+        return self.sectionClass("stock")()
+
+
+def splitCommands(tokens: List[str]) -> List[str]:
+    """
+    Splits command line arguments into command lines, starting a new one at each
+    section or command name, unless it is the value of the previous option
+    e.g. ["stock", "load", "-t", "IBM", "pl"] -> ["stock", "load -t IBM", "pl"]
+    and ["load", "-t", "FI", "pl"] -> ["load -t FI", "pl"]
+    :param tokens:
+    :return:
+    """
+    mainNames = {name.lower() for name in MainLoop.commandNames()}
+    commandNames = mainNames
+    lines: List[List[str]] = []
+    for token in tokens:
+        # every option of the commands takes a value, e.g. -t FI
+        previous = lines[-1][-1] if lines else ""
+        isOptionValue = previous.startswith("-") and "=" not in previous
+        if not lines or (token.lower() in commandNames and not isOptionValue):
+            lines.append([])
+            if token.lower() in MainLoop.sections:
+                sectionNames = MainLoop.sectionClass(token.lower()).commandNames()
+                commandNames = mainNames | {name.lower() for name in sectionNames}
+        lines[-1].append(token)
+    return [" ".join(line) for line in lines]
+
+
+def runBatch(lines: List[str]) -> int:
+    """
+    Runs command lines as if they were typed at the prompt. A section name
+    (stock, forex) enters the section, quit leaves it.
+    :param lines:
+    :return: exit code, 1 if a command failed (unknown command, invalid arguments or
+    an error reported by the command)
+    """
+    loops: List[SectionLoop] = [MainLoop()]
+    exitCode = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
             continue
 
-        ###########################
-        # Load data for the stock #
-        ###########################
-        console.print(f"Results for : {findParserArgs.keyword}")
-        searchResultsDF: pd.DataFrame = AlphaVantageStockDataSource.find(
-            findParserArgs.keyword
-        )
-        # searchResultsDF: pd.DataFrame = searchStock(findParserArgs.keyword)
-        rich_dataframe.prettify(searchResultsDF)
-        # console.print(searchResultsDF.to_string())
-
-    if mainParserArgs.cmd == "forex":
-        ##############
-        # Get source #
-        ##############
-        forexParser = argparse.ArgumentParser(prog="forex")
-        ForexLoop().runLoop()
-
-    if mainParserArgs.cmd == "stock":
-        ##############
-        # Get source #
-        ##############
-        forexParser = argparse.ArgumentParser(prog="stock")
-        StockLoop().runLoop()
-
-    # # TODO : Add Stock loop
-    if continueLoop is False:
-        sys.exit(-1)
+        console.print(f"{loops[-1].sectionName}>> {line}")
+        result = loops[-1].runCommand(line)
+        if loops[-1].errorCount:
+            exitCode = 1
+        if isinstance(result, SectionLoop):
+            loops.append(result)
+        elif result is False:
+            loops.pop()
+            if not loops:
+                break
+    return exitCode
+
+
+def runHeadless(argv: List[str]) -> int:
+    args = batch_parser.parse_args(argv)
+
+    # no window is opened, the charts are saved to args.output
+    common.plots.useFileOutput(args.output)
+    # commands run one after the other, a background download would only spend
+    # API quota on data no command asks for
+    SourceSectionLoop.prefetchOnLoad = False
+
+    lines: List[str] = []
+    if args.script:
+        with open(args.script) as file:
+            lines += file.read().splitlines()
+    lines += splitCommands(args.commands)
+    return runBatch(lines)
+
+
+def main():
+    os.system("cls||clear")
+    MainLoop().runLoop()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(runHeadless(sys.argv[1:]))
+    main()
@@ -0,0 +1,41 @@
+"""
+Checks that a failing command is reported and counted without ending the section.
+
+python3 -m pytest tests
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import terminal  # noqa: E402
+from commands import Command, SectionLoop, command  # noqa: E402
+
+
+class FailingLoop(SectionLoop):
+    sectionName: str = "failing"
+    ranAfterFailure: bool = False
+
+    @command("fail", help="Raises, e.g. a listing that can't be downloaded")
+    def failCommand(self, args: argparse.Namespace) -> None:
+        raise ConnectionError("listing unavailable")
+
+    @command("next", help="Runs after the failing command")
+    def nextCommand(self, args: argparse.Namespace) -> None:
+        FailingLoop.ranAfterFailure = True
+
+
+def test_failing_handler_is_reported():
+    loop = FailingLoop()
+    assert loop.runCommand("fail") is True
+    assert loop.errorCount == 1
+
+
+def test_batch_continues_after_failing_handler(monkeypatch):
+    # a section of the main loop entered with "failing"
+    enter = Command("failing", (), (), "", lambda self, args: FailingLoop())
+    monkeypatch.setitem(terminal.MainLoop.registry, "failing", enter)
+    FailingLoop.ranAfterFailure = False
+
+    assert terminal.runBatch(["failing", "fail", "next"]) == 1
+    assert FailingLoop.ranAfterFailure
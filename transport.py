@@ -0,0 +1,284 @@
+import asyncio
+import io
+import json
+import os
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Tuple, Union
+
+import dotenv
+import httpx
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+##############################
+# Load environment variables #
+##############################
+# the shared transports below read their settings on import, even when this
+# module is imported before the rest of the terminal
+dotenv.load_dotenv()
+
+
+class ResponseStream(io.RawIOBase):
+    """
+    Readable file object over a streamed urllib3 response. Unlike the response
+    itself it doesn't report closed once the body is exhausted, which readers
+    such as pd.read_csv check before their last read.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        return self.raw.readinto(buffer)
+
+
+class AsyncResponseStream(io.RawIOBase):
+    """
+    Readable file object over the chunks of a streamed httpx response, for a
+    parser running on a worker thread : each read waits for the next chunk
+    from the event loop, so the body is parsed as it arrives.
+    """
+
+    def __init__(
+        self, chunks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop, timeout: float
+    ):
+        """
+        :param chunks: e.g. response.aiter_bytes()
+        :param loop: event loop the response belongs to
+        :param timeout: seconds to wait for a chunk
+        """
+        self.chunks = chunks
+        self.loop = loop
+        self.timeout = timeout
+        self.pending: bytes = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self.pending:
+            # an empty chunk marks the end of the body
+            self.pending = asyncio.run_coroutine_threadsafe(
+                anext(self.chunks, b""), self.loop
+            ).result(self.timeout)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+class HTTPTransport:
+    """
+    Pooled keep-alive HTTP client shared by the data sources.
+
+    A single requests.Session is reused for every call so the TCP/TLS
+    connection to the API host is kept open between requests. Failed requests
+    (connection errors and 429/5xx responses) are retried with exponential
+    backoff. The a-prefixed methods are the asyncio counterparts and run on a
+    pooled httpx.AsyncClient.
+    """
+
+    retryStatusCodes: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    connectTimeoutKeyName: str = "OPENTERMINAL_HTTP_CONNECT_TIMEOUT"
+    readTimeoutKeyName: str = "OPENTERMINAL_HTTP_READ_TIMEOUT"
+    retriesKeyName: str = "OPENTERMINAL_HTTP_RETRIES"
+    backoffKeyName: str = "OPENTERMINAL_HTTP_BACKOFF"
+
+    def __init__(
+        self,
+        timeout: Union[Tuple[float, float], None] = None,
+        retries: Union[int, None] = None,
+        backoffFactor: Union[float, None] = None,
+        poolSize: int = 16,
+        asyncPoolSize: int = 128,
+    ):
+        """
+        :param timeout: (connect, read) timeout in seconds
+        :param retries: number of retries for failed requests
+        :param backoffFactor: sleep between retries is backoffFactor * 2 ** (retry - 1)
+        :param poolSize: number of connections kept open per host
+        :param asyncPoolSize: number of connections of the async client
+        """
+        # explicit settings, the others are read from the environment by configure
+        self.settings: Dict[str, Any] = {
+            "timeout": timeout,
+            "retries": retries,
+            "backoffFactor": backoffFactor,
+        }
+        self.poolSize: int = poolSize
+        self.asyncPoolSize: int = asyncPoolSize
+        self.configure()
+
+    def configure(self) -> None:
+        """
+        Reads the timeouts and retries, from the environment unless given to the
+        constructor, and creates the pooled session
+        :return:
+        """
+        self.timeout: Tuple[float, float] = self.settings["timeout"] or (
+            float(os.environ.get(self.connectTimeoutKeyName, 5)),
+            float(os.environ.get(self.readTimeoutKeyName, 30)),
+        )
+        self.retries: int = (
+            self.settings["retries"]
+            if self.settings["retries"] is not None
+            else int(os.environ.get(self.retriesKeyName, 3))
+        )
+        self.backoffFactor: float = (
+            self.settings["backoffFactor"]
+            if self.settings["backoffFactor"] is not None
+            else float(os.environ.get(self.backoffKeyName, 0.5))
+        )
+
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoffFactor,
+            status_forcelist=self.retryStatusCodes,
+            allowed_methods=("GET",),
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.poolSize, pool_maxsize=self.poolSize, max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+        )
+
+        # created on first async use, as it is bound to the running event loop
+        self.asyncClient: Union[httpx.AsyncClient, None] = None
+        self.asyncClientLoop: Union[asyncio.AbstractEventLoop, None] = None
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a GET request over the pooled session
+        :param url:
+        :param kwargs: forwarded to requests.Session.get
+        :return:
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        r = self.session.get(url, **kwargs)
+        r.raise_for_status()
+        return r
+
+    def getJSON(self, url: str) -> Dict:
+        return self.get(url).json()
+
+    @staticmethod
+    def readCSV(body: io.BufferedReader, parseFunction: Callable[[BinaryIO], Any]) -> Any:
+        # error and throttle responses are JSON even when CSV was requested
+        if body.peek(1)[:1] == b"{":
+            return json.load(body)
+        return parseFunction(body)
+
+    def getCSV(self, url: str, parseFunction: Callable[[BinaryIO], Any]) -> Union[Any, Dict]:
+        """
+        Streams a CSV response into parseFunction without loading the whole body first
+        :param url:
+        :param parseFunction: called with the decoded response stream
+        :return: result of parseFunction, or the payload dict if the API answered with JSON
+        """
+        r = self.get(url, stream=True)
+        r.raw.decode_content = True
+        try:
+            return self.readCSV(io.BufferedReader(ResponseStream(r.raw)), parseFunction)
+        finally:
+            r.close()
+
+    def getAsyncClient(self) -> httpx.AsyncClient:
+        """
+        Returns the async client of the running event loop. A new client is created
+        when the loop changed, e.g. on a second asyncio.run, as the connections of
+        the previous one belong to a closed loop.
+        :return:
+        """
+        loop = asyncio.get_running_loop()
+        if (
+            self.asyncClient is None
+            or self.asyncClient.is_closed
+            or self.asyncClientLoop is not loop
+        ):
+            self.asyncClientLoop = loop
+            self.asyncClient = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                limits=httpx.Limits(
+                    max_connections=self.asyncPoolSize,
+                    max_keepalive_connections=self.asyncPoolSize,
+                ),
+                headers={"Accept-Encoding": "gzip, deflate"},
+                transport=httpx.AsyncHTTPTransport(retries=self.retries),
+            )
+        return self.asyncClient
+
+    async def aget(self, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends a GET request without blocking the event loop. Connection errors are
+        retried by httpx, 429/5xx responses with exponential backoff.
+        :param url:
+        :param kwargs: forwarded to httpx.AsyncClient.get
+        :return:
+        """
+        client = self.getAsyncClient()
+        for attempt in range(self.retries + 1):
+            r = await client.get(url, **kwargs)
+            if r.status_code not in self.retryStatusCodes or attempt == self.retries:
+                break
+            await asyncio.sleep(self.backoffFactor * 2**attempt)
+        r.raise_for_status()
+        return r
+
+    async def agetJSON(self, url: str) -> Dict:
+        return (await self.aget(url)).json()
+
+    async def agetCSV(
+        self, url: str, parseFunction: Callable[[BinaryIO], Any]
+    ) -> Union[Any, Dict]:
+        """
+        Async counterpart of getCSV : parseFunction runs on a worker thread and reads
+        the body as it is received, without loading it whole or blocking the loop
+        :param url:
+        :param parseFunction: called with the decoded response stream
+        :return: result of parseFunction, or the payload dict if the API answered with JSON
+        """
+        client = self.getAsyncClient()
+        for attempt in range(self.retries + 1):
+            async with client.stream("GET", url) as r:
+                if r.status_code not in self.retryStatusCodes or attempt == self.retries:
+                    r.raise_for_status()
+                    body = AsyncResponseStream(
+                        r.aiter_bytes(), asyncio.get_running_loop(), self.timeout[1]
+                    )
+                    return await asyncio.to_thread(
+                        self.readCSV, io.BufferedReader(body), parseFunction
+                    )
+            await asyncio.sleep(self.backoffFactor * 2**attempt)
+
+    def close(self) -> None:
+        logger.debug("Closing HTTP transport")
+        self.session.close()
+
+    async def aclose(self) -> None:
+        if self.asyncClient is not None:
+            await self.asyncClient.aclose()
+
+    def reset(self) -> None:
+        """
+        Closes the connections and reads the settings from the environment again
+        :return:
+        """
+        self.close()
+        # the async client is recreated with the new settings on next use
+        self.asyncClient = None
+        self.asyncClientLoop = None
+        self.configure()
+
+
+# transport shared by every data source
+defaultTransport: HTTPTransport = HTTPTransport()
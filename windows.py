@@ -0,0 +1,100 @@
+import argparse
+import datetime
+import re
+from typing import Tuple, Union
+
+DateLike = Union[datetime.date, str, None]
+
+# window used when no start is given
+defaultWindow: str = "1y"
+# e.g. 10d (trading days), 2w, 6m, 5y
+windowPattern = re.compile(r"^(\d+)([dwmy])$")
+
+
+def toDate(value: Union[datetime.date, str]) -> datetime.date:
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(value.strip())
+
+
+def rollTradingDay(day: datetime.date, roll: str) -> datetime.date:
+    """
+    Moves day to a trading day (Mon-Fri)
+    :param day:
+    :param roll: "forward" or "backward"
+    :return:
+    """
+    import numpy as np
+
+    return np.busday_offset(np.datetime64(day, "D"), 0, roll=roll).astype(datetime.date)
+
+
+def isWindowSpec(value: str) -> bool:
+    value = value.strip().lower()
+    return value in ("max", "ytd") or windowPattern.match(value) is not None
+
+
+def parseWindowArgument(value: str) -> str:
+    """
+    argparse type of start date arguments : a YYYY-MM-DD date or a window spec
+    :param value:
+    :return:
+    """
+    if not isWindowSpec(value):
+        try:
+            toDate(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                f"Expected YYYY-MM-DD or a window such as 1y, 6m, ytd, max : {value}"
+            )
+    return value
+
+
+def resolveWindow(
+    start: DateLike = None,
+    end: DateLike = None,
+    today: Union[datetime.date, None] = None,
+) -> Tuple[Union[datetime.date, None], datetime.date]:
+    """
+    Resolves a date window at call time, on trading day boundaries. The end is the
+    last trading day on or before end (default today), the start is the first trading
+    day on or after start.
+    :param start: date, or window spec relative to the end : Nd (trading days), Nw,
+    Nm, Ny, ytd or max. Defaults to defaultWindow
+    :param end: date, defaults to today
+    :param today: used instead of the current date, for reproducible windows
+    :return: (start, end), start is None for max. A window without trading day, e.g.
+    a weekend, resolves to a start after the end, i.e. an empty window
+    """
+    # numpy and pandas are imported here so the command parsers don't load them
+    import numpy as np
+    import pandas as pd
+
+    requestedEnd = toDate(end) if end is not None else today or datetime.date.today()
+    endDate = rollTradingDay(requestedEnd, "backward")
+
+    spec = defaultWindow if start is None else start
+    if isinstance(spec, str) and isWindowSpec(spec):
+        spec = spec.strip().lower()
+        if spec == "max":
+            return None, endDate
+        if spec == "ytd":
+            return rollTradingDay(datetime.date(endDate.year, 1, 1), "forward"), endDate
+
+        count, unit = windowPattern.match(spec).groups()
+        if unit == "d":
+            # the last count trading days, including the end
+            startDate = np.busday_offset(np.datetime64(endDate, "D"), 1 - int(count))
+            return startDate.astype(datetime.date), endDate
+        offset = {
+            "w": pd.DateOffset(weeks=int(count)),
+            "m": pd.DateOffset(months=int(count)),
+            "y": pd.DateOffset(years=int(count)),
+        }[unit]
+        spec = (pd.Timestamp(endDate) - offset).date()
+
+    startDate = toDate(spec)
+    assert startDate <= requestedEnd, Exception("Start date should be less than end date")
+    return rollTradingDay(startDate, "forward"), endDate